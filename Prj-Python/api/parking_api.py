@@ -1,20 +1,36 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Query, Body
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Query, Body, BackgroundTasks, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 import sys
 import os
+import io
+import shutil
+import tempfile
+import csv
+import json
+import base64
 from datetime import datetime, timedelta
 import hyperlpr3 as lpr3
-import cv2
 import numpy as np
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, Literal
 
 # 获取项目根目录的绝对路径
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 from models.database import get_session, Vehicle, ParkingRecord, ParkingLot, User
+from utils.inference_executor import InferenceExecutor, QueueFullError
+from utils.micro_batcher import MicroBatcher
+from utils.evidence_store import EvidenceStore, KIND_FULL, KIND_PLATE
+from utils.parking_stats import query_statistics, monthly_report_data
+from utils.parking_records import records_query, after_cursor, open_record_query
+from utils.rollups import record_entry, record_exit
+from utils.occupancy import OccupancyCounter
+from utils.report_generator import generate_monthly_report
+from hyperlpr3.common.image_decode import decode_reduced, decode_full
 
 app = FastAPI(
     title="停车场管理系统API",
@@ -31,10 +47,61 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-# 车牌识别器实例
-catcher = lpr3.LicensePlateCatcher(detect_level=lpr3.DETECT_LEVEL_HIGH)
+# 识别线程数与排队上限，可通过环境变量配置
+RECOGNITION_WORKERS = int(os.environ.get("LPR_WORKERS", 2))
+RECOGNITION_QUEUE_SIZE = int(os.environ.get("LPR_QUEUE_SIZE", 32))
+# 跨请求微批处理：单批最大图片数（1表示不合批）与凑批等待时间（毫秒）
+RECOGNITION_BATCH_SIZE = int(os.environ.get("LPR_BATCH_SIZE", 1))
+RECOGNITION_BATCH_WAIT_MS = float(os.environ.get("LPR_BATCH_WAIT_MS", 5))
+# 大尺寸抓拍图按此长边下限以1/2、1/4缩小解码后检测
+DETECT_MAX_SIDE = int(os.environ.get("LPR_DETECT_MAX_SIDE", 1280))
+
+# 车牌识别在独立的有界线程池中执行，避免阻塞事件循环，每个线程持有一个识别器实例
+recognizer = InferenceExecutor(
+    lambda: lpr3.LicensePlateCatcher(detect_level=lpr3.DETECT_LEVEL_HIGH),
+    workers=RECOGNITION_WORKERS,
+    max_queue=RECOGNITION_QUEUE_SIZE
+)
+
+# 多个闸口同时上传时，把并发请求合并为一次批量检测和一次批量识别
+batcher = None
+if RECOGNITION_BATCH_SIZE > 1:
+    batcher = MicroBatcher(
+        recognizer,
+        lambda catcher, items: recognize_batch(catcher, items),
+        max_batch=RECOGNITION_BATCH_SIZE,
+        max_wait_ms=RECOGNITION_BATCH_WAIT_MS
+    )
+
+
+# 入场/出场证据图片，按内容哈希分层存放
+evidence_store = EvidenceStore(os.environ.get("LPR_EVIDENCE_DIR", "uploads"))
+
+# 各停车场在场车辆计数，启动时从数据库初始化，按LPR_OCCUPANCY_RECONCILE秒（默认300）与数据库对账
+occupancy = OccupancyCounter(get_session)
+OCCUPANCY_RECONCILE_SECONDS = float(os.environ.get("LPR_OCCUPANCY_RECONCILE", 300))
+
+# 停车记录分页：默认与最大每页记录数；导出时每批从数据库取出的记录数
+RECORDS_PAGE_SIZE = 100
+RECORDS_MAX_PAGE_SIZE = 1000
+RECORDS_EXPORT_BATCH = 1000
+RECORD_FIELDS = ["id", "plate_number", "parking_lot_name", "entry_time", "exit_time", "duration", "fee", "status"]
+
+
+@app.on_event("startup")
+def start_occupancy():
+    occupancy.start(OCCUPANCY_RECONCILE_SECONDS)
+
+
+@app.on_event("shutdown")
+def shutdown_recognizer():
+    if batcher is not None:
+        batcher.close()
+    recognizer.shutdown(wait=False)
+    occupancy.stop()
 
 
 def get_db():
@@ -45,29 +112,66 @@ def get_db():
         db.close()
 
 
-def save_image(file: UploadFile) -> str:
-    """保存上传的图片并返回保存路径"""
-    upload_dir = Path("uploads")
-    upload_dir.mkdir(exist_ok=True)
+def write_evidence(digest: str, data: bytes, plate_crop: np.ndarray):
+    """在响应返回后写入证据图片与车牌裁剪图，相同图片只保存一份"""
+    evidence_store.put(data, plate_crop, digest=digest)
 
-    file_path = upload_dir / f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{file.filename}"
-    with open(file_path, "wb") as buffer:
-        buffer.write(file.file.read())
-    return str(file_path)
 
-
-def recognize_plate(image_path: str) -> str:
-    """识别图片中的车牌号码"""
-    image = cv2.imread(str(image_path))
+def decode_image(data: bytes) -> tuple:
+    """
+    直接从请求内容解码图片，不经过磁盘；大图只解码缩小的版本用于检测
+    Returns:
+        (image, scale)，scale为原图相对image的放大倍数
+    """
+    image, scale = decode_reduced(data, DETECT_MAX_SIDE) if data else (None, 1.0)
     if image is None:
         raise HTTPException(status_code=400, detail="Invalid image file")
+    return image, scale
+
 
-    results = catcher(image)
+def best_plate(image: np.ndarray, scale: float, results: list) -> tuple:
+    """
+    Args:
+        image: 检测用的（可能缩小的）图像
+        scale: 原图相对image的放大倍数，results中的坐标为原图坐标
+    Returns:
+        (置信度最高的车牌号, 该车牌区域的裁剪图)
+    """
     if not results:
         raise HTTPException(status_code=400, detail="No license plate detected")
+    code, _, _, box = max(results, key=lambda x: x[1])[:4]
+    h, w = image.shape[:2]
+    x1, y1 = max(int(box[0] / scale), 0), max(int(box[1] / scale), 0)
+    x2, y2 = min(int(box[2] / scale), w), min(int(box[3] / scale), h)
+    return code, image[y1:y2, x1:x2].copy()
+
 
-    # 返回置信度最高的车牌号
-    return max(results, key=lambda x: x[1])[0]
+def recognize_plate(catcher, data: bytes) -> tuple:
+    """识别图片中的车牌号码，在识别线程池中执行，catcher为该线程的识别器"""
+    image, scale = decode_image(data)
+    return best_plate(image, scale, catcher.run_scaled(image, scale, lambda: decode_full(data)))
+
+
+def recognize_batch(catcher, items: list) -> list:
+    """批量识别(image, scale, data)，车牌在缩小图上过小时才解码对应的原图"""
+    images, scales, loaders = list(), list(), list()
+    for image, scale, data in items:
+        images.append(image)
+        scales.append(scale)
+        loaders.append(lambda data=data: decode_full(data))
+    return catcher.batch(images, scales, loaders)
+
+
+async def recognize_upload(data: bytes) -> tuple:
+    """
+    识别上传的图片，启用微批处理时与其他并发请求合并推理
+    Returns:
+        (车牌号, 车牌裁剪图)
+    """
+    if batcher is None:
+        return await recognizer.run(recognize_plate, data)
+    image, scale = await run_in_threadpool(decode_image, data)
+    return best_plate(image, scale, await batcher.run((image, scale, data)))
 
 
 @app.post("/vehicle/entry", 
@@ -98,17 +202,21 @@ def recognize_plate(image_path: str) -> str:
     }
 )
 async def vehicle_entry(
+        background_tasks: BackgroundTasks,
         parking_lot_id: int = File(..., description="停车场ID"),
         file: UploadFile = File(..., description="车辆图片"),
         db: Session = Depends(get_db)
 ):
     """处理车辆入场"""
-    # 保存图片
-    image_path = save_image(file)
+    # 读取上传内容，识别直接在内存中解码；证据图片以内容哈希引用
+    data = await file.read()
+    image_hash = await run_in_threadpool(evidence_store.digest, data)
 
     # 识别车牌
     try:
-        plate_number = recognize_plate(image_path)
+        plate_number, plate_crop = await recognize_upload(data)
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail="Recognition queue is full, please retry later")
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -125,10 +233,16 @@ async def vehicle_entry(
         vehicle_id=vehicle.id,
         parking_lot_id=parking_lot_id,
         entry_time=datetime.now(),
-        entry_image=image_path
+        entry_image=image_hash
     )
     db.add(parking_record)
-    db.commit()
+    # 小时汇总与停车记录在同一事务中提交
+    record_entry(db, parking_lot_id, parking_record.entry_time)
+    with occupancy.update(parking_lot_id, 1):
+        db.commit()
+
+    # 响应返回后再写入图片，记录中已是图片哈希
+    background_tasks.add_task(write_evidence, image_hash, data, plate_crop)
 
     return {
         "message": "Vehicle entry recorded successfully",
@@ -166,16 +280,20 @@ async def vehicle_entry(
     }
 )
 async def vehicle_exit(
+        background_tasks: BackgroundTasks,
         file: UploadFile = File(..., description="出场图片"),
         db: Session = Depends(get_db)
 ):
     """处理车辆出场"""
-    # 保存出场图片
-    image_path = save_image(file)
+    # 读取上传内容，识别直接在内存中解码；证据图片以内容哈希引用
+    data = await file.read()
+    image_hash = await run_in_threadpool(evidence_store.digest, data)
 
     # 识别车牌
     try:
-        plate_number = recognize_plate(image_path)
+        plate_number, plate_crop = await recognize_upload(data)
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail="Recognition queue is full, please retry later")
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -184,14 +302,7 @@ async def vehicle_exit(
     if not vehicle:
         raise HTTPException(status_code=404, detail=f"Vehicle with plate number {plate_number} not found")
 
-    parking_record = (
-        db.query(ParkingRecord)
-        .filter(
-            ParkingRecord.vehicle_id == vehicle.id,
-            ParkingRecord.exit_time.is_(None)
-        )
-        .first()
-    )
+    parking_record = open_record_query(db, vehicle.id).first()
     if not parking_record:
         raise HTTPException(status_code=404, detail=f"No active parking record found for vehicle {plate_number}")
 
@@ -206,9 +317,14 @@ async def vehicle_exit(
     parking_record.exit_time = exit_time
     parking_record.parking_duration = duration
     parking_record.fee = fee
-    parking_record.exit_image = image_path
+    parking_record.exit_image = image_hash
+    record_exit(db, parking_record.parking_lot_id, parking_record.entry_time, fee, duration)
+
+    with occupancy.update(parking_record.parking_lot_id, -1):
+        db.commit()
 
-    db.commit()
+    # 响应返回后再写入图片，记录中已是图片哈希
+    background_tasks.add_task(write_evidence, image_hash, data, plate_crop)
 
     return {
         "message": "Vehicle exit recorded successfully",
@@ -263,94 +379,119 @@ async def get_statistics(
     start = datetime.strptime(start_date, "%Y-%m-%d")
     end = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
 
-    # 获取所有停车场
-    parking_lots = db.query(ParkingLot).all()
-    
-    # 初始化统计数据
-    total_stats = {
-        "total_vehicles": 0,
-        "total_revenue": 0.0,
-        "total_duration": 0.0,
-        "current_occupancy": 0
+    return query_statistics(db, start, end, occupancy=occupancy.snapshot())
+
+
+@app.get("/parking/occupancy",
+    summary="获取在场车辆数",
+    description="返回各停车场当前在场车辆数，读取进程内计数，不查询数据库，适合前端高频轮询",
+    response_description="返回各停车场在场车辆数",
+    responses={
+        200: {
+            "description": "获取成功",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "total": 50,
+                        "lots": {"1": 25, "2": 25},
+                        "last_drift": {}
+                    }
+                }
+            }
+        }
     }
-    
-    # 初始化每个停车场的统计数据
-    lot_statistics = []
-    
-    # 初始化24小时分布数据
-    hourly_distribution = {f"{i:02d}": 0 for i in range(24)}
-    
-    for lot in parking_lots:
-        # 查询该停车场在指定时间范围内的记录
-        records = (
-            db.query(ParkingRecord)
-            .filter(
-                ParkingRecord.parking_lot_id == lot.id,
-                ParkingRecord.entry_time >= start,
-                ParkingRecord.entry_time < end
-            )
-            .all()
-        )
-        
-        # 计算该停车场的统计数据
-        lot_total_vehicles = len(records)
-        lot_total_revenue = sum(record.fee or 0 for record in records)
-        
-        # 计算当前在场车辆
-        current_vehicles = (
-            db.query(ParkingRecord)
-            .filter(
-                ParkingRecord.parking_lot_id == lot.id,
-                ParkingRecord.entry_time <= datetime.now(),
-                ParkingRecord.exit_time == None
-            )
-            .count()
-        )
-        
-        # 更新总统计数据
-        total_stats["total_vehicles"] += lot_total_vehicles
-        total_stats["total_revenue"] += lot_total_revenue
-        total_stats["current_occupancy"] += current_vehicles
-        
-        # 计算该停车场的占用率
-        occupancy_rate = current_vehicles / lot.capacity if lot.capacity > 0 else 0
-        
-        # 添加停车场统计数据
-        lot_statistics.append({
-            "lot_id": lot.id,
-            "lot_name": lot.name,
-            "total_vehicles": lot_total_vehicles,
-            "total_revenue": lot_total_revenue,
-            "current_occupancy": current_vehicles,
-            "occupancy_rate": occupancy_rate
-        })
-        
-        # 统计24小时分布
-        for record in records:
-            hour = record.entry_time.strftime("%H")
-            hourly_distribution[hour] = hourly_distribution.get(hour, 0) + 1
-    
-    # 计算平均停车时长
-    total_duration = sum(
-        (record.exit_time - record.entry_time).total_seconds() / 3600
-        for record in db.query(ParkingRecord)
-        .filter(
-            ParkingRecord.entry_time >= start,
-            ParkingRecord.entry_time < end,
-            ParkingRecord.exit_time != None
-        )
-        .all()
-    )
-    average_duration = total_duration / total_stats["total_vehicles"] if total_stats["total_vehicles"] > 0 else 0
-    
+)
+async def get_occupancy():
+    """获取在场车辆数"""
+    counts = occupancy.snapshot()
     return {
-        "total_vehicles": total_stats["total_vehicles"],
-        "total_revenue": total_stats["total_revenue"],
-        "average_duration": average_duration,
-        "current_occupancy": total_stats["current_occupancy"],
-        "lot_statistics": lot_statistics,
-        "hourly_distribution": hourly_distribution
+        "total": sum(counts.values()),
+        "lots": counts,
+        "last_drift": occupancy.last_drift
+    }
+
+
+@app.get("/reports/monthly",
+    summary="生成月度报表",
+    description="从小时汇总表计算指定月份的停车次数、收入、日均车流量、平均停车时长与高峰时段，生成PDF报表",
+    response_description="返回PDF文件",
+    responses={
+        400: {"description": "月份无效"}
     }
+)
+async def get_monthly_report(
+        background_tasks: BackgroundTasks,
+        year: int = Query(..., description="年份"),
+        month: int = Query(..., ge=1, le=12, description="月份"),
+        db: Session = Depends(get_db)
+):
+    """生成月度报表"""
+    # 每个请求写入自己的临时目录，同月并发请求不会写同一个文件；响应发送后删除
+    output_dir = tempfile.mkdtemp(prefix="monthly_report_")
+    background_tasks.add_task(shutil.rmtree, output_dir, ignore_errors=True)
+    filename = await run_in_threadpool(build_monthly_report, db, year, month, output_dir)
+    return FileResponse(filename, media_type="application/pdf", filename=Path(filename).name)
+
+
+def build_monthly_report(db: Session, year: int, month: int, output_dir: str) -> str:
+    """查询报表数据并生成PDF，两者都是阻塞操作，在线程池中执行"""
+    return generate_monthly_report(year, month, monthly_report_data(db, year, month), output_dir)
+
+
+@app.get("/metrics/recognition",
+    summary="识别队列指标",
+    description="返回车牌识别线程池的线程数、排队深度、正在执行数、累计完成与拒绝数，以及微批处理的批次统计（未启用时为null）",
+    response_description="返回识别队列指标",
+    responses={
+        200: {
+            "description": "获取成功",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "workers": 2,
+                        "max_queue": 32,
+                        "queue_depth": 3,
+                        "running": 2,
+                        "completed": 1024,
+                        "rejected": 0,
+                        "max_queue_depth": 12,
+                        "batching": {
+                            "max_batch": 8,
+                            "max_wait_ms": 5.0,
+                            "batches": 300,
+                            "mean_batch_size": 3.4
+                        }
+                    }
+                }
+            }
+        }
+    }
+)
+async def get_recognition_metrics():
+    """获取识别队列指标"""
+    return dict(recognizer.metrics(), batching=batcher.metrics() if batcher is not None else None)
+
+
+@app.get("/evidence/{image_hash}",
+    summary="获取证据图片",
+    description="按停车记录中entry_image/exit_image的哈希获取完整图片（kind=full）或车牌裁剪图（kind=plate）",
+    response_description="返回JPEG图片",
+    responses={
+        404: {"description": "图片不存在"}
+    }
+)
+async def get_evidence(
+    image_hash: str,
+    kind: str = Query(KIND_FULL, description="full：完整图片，plate：车牌裁剪图")
+):
+    """获取证据图片"""
+    if kind not in (KIND_FULL, KIND_PLATE) or len(image_hash) != 64 or not all(
+            c in "0123456789abcdef" for c in image_hash):
+        raise HTTPException(status_code=404, detail="图片不存在")
+    path = evidence_store.path(image_hash, kind)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="图片不存在")
+    return FileResponse(str(path), media_type="image/jpeg")
 
 
 @app.get("/parking/lots",
@@ -431,10 +572,82 @@ async def update_parking_lot(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+def record_to_dict(record) -> dict:
+    return {
+        "id": record.ParkingRecord.id,
+        "plate_number": record.plate_number,
+        "parking_lot_name": record.parking_lot_name,
+        "entry_time": record.ParkingRecord.entry_time,
+        "exit_time": record.ParkingRecord.exit_time,
+        "duration": record.ParkingRecord.parking_duration,
+        "fee": record.ParkingRecord.fee,
+        "status": "已离场" if record.ParkingRecord.exit_time else "在场"
+    }
+
+
+def encode_cursor(entry_time: datetime, record_id: int) -> str:
+    """分页游标：上一页最后一条记录的(entry_time, id)"""
+    return base64.urlsafe_b64encode(f"{entry_time.isoformat()}|{record_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        entry_time, record_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(entry_time), int(record_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def record_batches(start_date: str, end_date: str, plate_number: str, status: str,
+                   size: int = RECORDS_EXPORT_BATCH):
+    """
+    按(entry_time, id)游标逐批查询记录，每批转换为字典列表
+
+    每批用新的会话执行一次带LIMIT的短查询并立即关闭，批与批之间不持有读游标和读事务，
+    导出期间入场/出场的提交不会因数据库被锁而失败
+    """
+    cursor = None
+    while True:
+        db = get_session()
+        try:
+            query = records_query(db, start_date, end_date, plate_number, status)
+            if cursor is not None:
+                query = after_cursor(query, *cursor)
+            batch = [record_to_dict(record) for record in query.limit(size).all()]
+        finally:
+            db.close()
+        if batch:
+            yield batch
+        if len(batch) < size:
+            return
+        cursor = batch[-1]["entry_time"], batch[-1]["id"]
+
+
+def stream_records_ndjson(batches):
+    for batch in batches:
+        yield "".join(json.dumps(item, ensure_ascii=False, default=datetime.isoformat) + "\n" for item in batch)
+
+
+def stream_records_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=RECORD_FIELDS)
+    # 带BOM，Excel可直接打开中文
+    buffer.write("\ufeff")
+    writer.writeheader()
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
 @app.get("/parking/records",
     summary="获取停车记录",
-    description="获取所有或指定条件的停车记录",
-    response_description="返回停车记录列表",
+    description="按入场时间倒序获取所有或指定条件的停车记录；给出limit或cursor时分页返回，"
+                "还有下一页时响应头X-Next-Cursor为下一页的游标",
+    response_description="返回一页停车记录",
     responses={
         200: {
             "description": "成功获取停车记录",
@@ -456,44 +669,53 @@ async def update_parking_lot(
     }
 )
 async def get_parking_records(
+    response: Response,
     start_date: str = Query(None, description="开始日期 YYYY-MM-DD"),
     end_date: str = Query(None, description="结束日期 YYYY-MM-DD"),
     plate_number: str = Query(None, description="车牌号"),
     status: str = Query(None, description="状态：在场/已离场"),
+    limit: int = Query(None, ge=1, le=RECORDS_MAX_PAGE_SIZE,
+                       description=f"每页记录数，只给出cursor时默认{RECORDS_PAGE_SIZE}"),
+    cursor: str = Query(None, description="上一页响应头X-Next-Cursor的值，为空时返回第一页"),
     db: Session = Depends(get_db)
 ):
     """获取停车记录"""
-    query = (
-        db.query(
-            ParkingRecord,
-            Vehicle.plate_number,
-            ParkingLot.name.label('parking_lot_name')
+    query = records_query(db, start_date, end_date, plate_number, status)
+    # limit与cursor都未给出时保持原接口行为，返回全部记录
+    if limit is None and not cursor:
+        return [record_to_dict(record) for record in query.all()]
+    limit = limit or RECORDS_PAGE_SIZE
+    if cursor:
+        query = after_cursor(query, *decode_cursor(cursor))
+
+    # 多取一条判断是否还有下一页
+    records = query.limit(limit + 1).all()
+    if len(records) > limit:
+        records = records[:limit]
+        last = records[-1].ParkingRecord
+        response.headers["X-Next-Cursor"] = encode_cursor(last.entry_time, last.id)
+
+    return [record_to_dict(record) for record in records]
+
+
+@app.get("/parking/records/export",
+    summary="导出停车记录",
+    description="以NDJSON（每行一个JSON对象）或CSV流式导出符合条件的全部停车记录，边查询边发送，服务端内存占用与记录数无关",
+    response_description="返回NDJSON或CSV流"
+)
+async def export_parking_records(
+    start_date: str = Query(None, description="开始日期 YYYY-MM-DD"),
+    end_date: str = Query(None, description="结束日期 YYYY-MM-DD"),
+    plate_number: str = Query(None, description="车牌号"),
+    status: str = Query(None, description="状态：在场/已离场"),
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="导出格式：ndjson/csv")
+):
+    """导出停车记录"""
+    batches = record_batches(start_date, end_date, plate_number, status)
+    if export_format == "csv":
+        return StreamingResponse(
+            stream_records_csv(batches),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": "attachment; filename=parking_records.csv"}
         )
-        .join(Vehicle)
-        .join(ParkingLot)
-    )
-
-    if start_date:
-        query = query.filter(ParkingRecord.entry_time >= datetime.strptime(start_date, "%Y-%m-%d"))
-    if end_date:
-        query = query.filter(ParkingRecord.entry_time <= datetime.strptime(end_date, "%Y-%m-%d"))
-    if plate_number:
-        query = query.filter(Vehicle.plate_number.like(f"%{plate_number}%"))
-    if status:
-        if status == "在场":
-            query = query.filter(ParkingRecord.exit_time.is_(None))
-        elif status == "已离场":
-            query = query.filter(ParkingRecord.exit_time.isnot(None))
-
-    records = query.order_by(ParkingRecord.entry_time.desc()).all()
-
-    return [{
-        "id": record.ParkingRecord.id,
-        "plate_number": record.plate_number,
-        "parking_lot_name": record.parking_lot_name,
-        "entry_time": record.ParkingRecord.entry_time,
-        "exit_time": record.ParkingRecord.exit_time,
-        "duration": record.ParkingRecord.parking_duration,
-        "fee": record.ParkingRecord.fee,
-        "status": "已离场" if record.ParkingRecord.exit_time else "在场"
-    } for record in records]
+    return StreamingResponse(stream_records_ndjson(batches), media_type="application/x-ndjson")
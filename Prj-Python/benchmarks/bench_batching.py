@@ -0,0 +1,99 @@
+"""
+跨请求微批处理基准
+
+模拟1~32个并发客户端，每个客户端串行提交TestImage图片（与parking_api相同：InferenceExecutor +
+可选的MicroBatcher），对比不同单批上限/凑批等待时间下的吞吐与单请求延迟p50/p99。
+--batch 1表示不合批，每个请求单独执行。
+
+用法（在Prj-Python目录下）：
+    python -m benchmarks.bench_batching --batch 1 --batch 4 --batch 8 --wait-ms 5 --clients 1 --clients 8 --clients 32
+"""
+import threading
+import time
+
+import click
+
+from benchmarks.common import load_bench_inputs, save_results, summarize
+
+import hyperlpr3 as lpr3
+from utils.inference_executor import InferenceExecutor
+from utils.micro_batcher import MicroBatcher
+
+
+def run_clients(submit, images: list, clients: int, duration: float) -> tuple:
+    """clients个线程在duration秒内串行提交请求，返回(请求数, 耗时, 延迟样本)"""
+    latencies = list()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(offset):
+        i = offset
+        samples = list()
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            submit(images[i % len(images)]).result()
+            samples.append((time.perf_counter() - t0) * 1000.0)
+            i += 1
+        with lock:
+            latencies.extend(samples)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return len(latencies), time.perf_counter() - start, latencies
+
+
+@click.command(help="Throughput and latency of cross-request micro-batching for 1-32 concurrent clients.")
+@click.option("-det", "--det", default="high", type=click.Choice(["low", "high"]))
+@click.option("--workers", default=2, type=click.IntRange(min=1), help="Recognition threads.")
+@click.option("--batch", "batches", multiple=True, type=click.IntRange(min=1), help="Max batch sizes, default 1 and 8.")
+@click.option("--wait-ms", default=5.0, type=float, help="Max wait to fill a batch.")
+@click.option("--clients", "client_counts", multiple=True, type=click.IntRange(min=1),
+              help="Concurrent clients, default 1 2 4 8 16 32.")
+@click.option("--duration", default=10.0, type=float, help="Seconds per run.")
+@click.option("-o", "--output", default="bench/batching.json", type=str)
+def main(det, workers, batches, wait_ms, client_counts, duration, output):
+    level = lpr3.DETECT_LEVEL_LOW if det == "low" else lpr3.DETECT_LEVEL_HIGH
+    images = [image for _, image in load_bench_inputs()]
+    rows = list()
+    print(f"{'batch':>6}{'clients':>9}{'req/s':>10}{'p50_ms':>10}{'p99_ms':>10}{'mean_bs':>9}")
+    for max_batch in batches or (1, 8):
+        executor = InferenceExecutor(lambda: lpr3.LicensePlateCatcher(detect_level=level), workers=workers,
+                                     max_queue=1024)
+        batcher = None
+        if max_batch > 1:
+            batcher = MicroBatcher(executor, lambda catcher, items: catcher.batch(items), max_batch=max_batch,
+                                   max_wait_ms=wait_ms)
+            submit = batcher.submit
+        else:
+            submit = lambda image: executor.submit(lambda catcher, item: catcher(item), image)
+        # 预热：让每个识别线程加载模型
+        for future in [submit(images[i % len(images)]) for i in range(workers * max_batch * 2)]:
+            future.result()
+        for clients in client_counts or (1, 2, 4, 8, 16, 32):
+            before = batcher.metrics() if batcher is not None else None
+            count, elapsed, latencies = run_clients(submit, images, clients, duration)
+            stats = summarize(latencies)
+            mean_bs = 1.0
+            if batcher is not None:
+                after = batcher.metrics()
+                batch_count = after['batches'] - before['batches']
+                items = after['mean_batch_size'] * after['batches'] - before['mean_batch_size'] * before['batches']
+                mean_bs = items / batch_count if batch_count else 0.0
+            rows.append(dict(max_batch=max_batch, wait_ms=wait_ms, clients=clients, requests=count,
+                             rps=count / elapsed, mean_batch_size=mean_bs, latency_ms=stats))
+            print(f"{max_batch:>6}{clients:>9}{count / elapsed:>10.1f}{stats['p50']:>10.1f}{stats['p99']:>10.1f}"
+                  f"{mean_bs:>9.2f}")
+        if batcher is not None:
+            batcher.close()
+        executor.shutdown()
+    save_results(output, dict(det=det, workers=workers, results=rows))
+    print(f"结果已保存到: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+大尺寸抓拍图的多分辨率解码基准
+
+TestImage中的图片放大到约4~8MP并重新编码为JPEG，模拟闸口相机上传的大图，
+对比"全图解码 + 识别"与"按尺寸缩小解码 + 识别（小车牌才解码原图）"的解码耗时、总耗时以及解码后图像的内存占用，
+并统计两种方式识别结果不一致的图片数。
+
+用法（在Prj-Python目录下）：
+    python -m benchmarks.bench_decode --upscale 2 --upscale 3 -n 3
+"""
+import time
+
+import click
+import cv2
+
+from benchmarks.common import list_test_images, read_image, save_results, summarize
+
+import hyperlpr3 as lpr3
+from hyperlpr3.common.image_decode import decode_full, decode_reduced
+
+
+def make_snapshots(upscale: float, quality: int = 95) -> list:
+    """返回[(name, jpeg_bytes), ...]"""
+    snapshots = list()
+    for path in list_test_images():
+        image = read_image(path)
+        if image is None:
+            continue
+        image = cv2.resize(image, None, fx=upscale, fy=upscale, interpolation=cv2.INTER_CUBIC)
+        ok, data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if ok:
+            snapshots.append((path.name, data.tobytes()))
+
+    return snapshots
+
+
+def run_full(catcher, data: bytes) -> tuple:
+    t0 = time.perf_counter()
+    image = decode_full(data)
+    t1 = time.perf_counter()
+    result = catcher(image)
+    return (t1 - t0) * 1000.0, (time.perf_counter() - t0) * 1000.0, image.nbytes, result
+
+
+def run_reduced(catcher, data: bytes) -> tuple:
+    loaded = list()
+
+    def load_full():
+        image = decode_full(data)
+        loaded.append(image.nbytes)
+        return image
+
+    t0 = time.perf_counter()
+    image, scale = decode_reduced(data)
+    t1 = time.perf_counter()
+    result = catcher.run_scaled(image, scale, load_full)
+    return (t1 - t0) * 1000.0, (time.perf_counter() - t0) * 1000.0, image.nbytes + sum(loaded), result
+
+
+@click.command(help="Decode time and memory of full vs reduced-resolution decoding for large snapshots.")
+@click.option("-det", "--det", default="high", type=click.Choice(["low", "high"]))
+@click.option("--upscale", "upscales", multiple=True, type=float, help="Upscale factors, default 2 and 3.")
+@click.option("-n", "--repeat", default=3, type=click.IntRange(min=1), help="Runs per image.")
+@click.option("-o", "--output", default="bench/decode.json", type=str)
+def main(det, upscales, repeat, output):
+    level = lpr3.DETECT_LEVEL_LOW if det == "low" else lpr3.DETECT_LEVEL_HIGH
+    catcher = lpr3.LicensePlateCatcher(detect_level=level)
+    rows = list()
+    print(f"{'upscale':>8}{'mode':>9}{'decode_ms':>11}{'total_ms':>10}{'mem_MB':>8}{'diff':>6}")
+    for upscale in upscales or (2.0, 3.0):
+        snapshots = make_snapshots(upscale)
+        stats = {mode: dict(decode=list(), total=list(), memory=list()) for mode in ("full", "reduced")}
+        diff = 0
+        for name, data in snapshots:
+            codes = dict()
+            for mode, fn in (("full", run_full), ("reduced", run_reduced)):
+                for _ in range(repeat):
+                    decode_ms, total_ms, nbytes, result = fn(catcher, data)
+                    stats[mode]["decode"].append(decode_ms)
+                    stats[mode]["total"].append(total_ms)
+                    stats[mode]["memory"].append(nbytes / 1024 / 1024)
+                codes[mode] = sorted(code for code, *_ in result)
+            if codes["full"] != codes["reduced"]:
+                diff += 1
+        for mode, samples in stats.items():
+            decode, total = summarize(samples["decode"]), summarize(samples["total"])
+            memory = sum(samples["memory"]) / max(len(samples["memory"]), 1)
+            rows.append(dict(upscale=upscale, mode=mode, images=len(snapshots), decode_ms=decode, total_ms=total,
+                             mean_memory_mb=memory, mismatched=diff))
+            print(f"{upscale:>8.1f}{mode:>9}{decode.get('p50', 0):>11.1f}{total.get('p50', 0):>10.1f}"
+                  f"{memory:>8.1f}{diff:>6}")
+    save_results(output, dict(det=det, repeat=repeat, results=rows))
+    print(f"结果已保存到: {output}")
+
+
+if __name__ == "__main__":
+    main()
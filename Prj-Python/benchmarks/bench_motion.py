@@ -0,0 +1,58 @@
+"""
+运动检测跳帧评估
+
+在TestImage/Video00*.mp4上统计MotionGate的跳帧比例与每帧额外耗时；
+--verify会同时对每一帧做检测，统计被跳过但实际检测到车牌的帧数，用于评估漏检风险。
+
+用法（在Prj-Python目录下）：
+    python -m benchmarks.bench_motion --verify
+"""
+import click
+import cv2
+
+from benchmarks.common import list_test_videos, save_results
+
+from utils.motion import MotionGate
+
+
+@click.command(help="Skip ratio and added latency of motion gating on the TestImage videos.")
+@click.option("-src", "--src", "videos", multiple=True, type=str, help="Videos, default TestImage/Video00*.mp4.")
+@click.option("--width", default=160, type=int)
+@click.option("--diff-threshold", default=25, type=int)
+@click.option("--min-area", default=0.002, type=float)
+@click.option("--hold", default=15, type=int)
+@click.option("--verify/--no-verify", default=False, help="Also detect on every frame to count skipped plates.")
+@click.option("-o", "--output", default="bench/motion.json", type=str)
+def main(videos, width, diff_threshold, min_area, hold, verify, output):
+    catcher = None
+    if verify:
+        import hyperlpr3 as lpr3
+        catcher = lpr3.LicensePlateCatcher(detect_level=lpr3.DETECT_LEVEL_LOW)
+    rows = list()
+    print(f"{'video':<16}{'frames':>8}{'skipped':>9}{'ratio':>8}{'ms/frame':>10}{'missed':>8}")
+    for video in list(videos) or [str(p) for p in list_test_videos()]:
+        gate = MotionGate(width=width, diff_threshold=diff_threshold, min_area=min_area, hold=hold)
+        missed = 0
+        cap = cv2.VideoCapture(video)
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                active = gate.update(frame)
+                if catcher is not None and not active and len(catcher.detect(frame)) > 0:
+                    missed += 1
+        finally:
+            cap.release()
+        row = dict(video=video, frames=gate.frames, skipped=gate.skipped, skip_ratio=gate.skip_ratio,
+                   mean_cost_ms=gate.mean_cost_ms, missed=missed if verify else None)
+        rows.append(row)
+        name = video.replace("\\", "/").split("/")[-1]
+        print(f"{name:<16}{gate.frames:>8}{gate.skipped:>9}{gate.skip_ratio:>8.1%}{gate.mean_cost_ms:>10.3f}"
+              f"{missed if verify else '-':>8}")
+    save_results(output, dict(results=rows))
+    print(f"结果已保存到: {output}")
+
+
+if __name__ == "__main__":
+    main()
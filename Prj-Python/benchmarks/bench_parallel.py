@@ -0,0 +1,58 @@
+"""
+多进程识别池扩展性测试
+
+对ParallelLicensePlateCatcher依次使用1..N个工作进程，处理同一批TestImage图片与视频抽帧，
+统计吞吐（图片/秒）、相对单进程的加速比和并行效率。每个工作进程的onnxruntime线程数默认为1，
+以便单独观察进程级扩展。
+
+用法（在Prj-Python目录下）：
+    python -m benchmarks.bench_parallel --max-workers 8 -n 400
+"""
+import os
+import time
+
+import click
+
+from benchmarks.common import load_bench_inputs, peak_rss_mb, save_results
+
+import hyperlpr3 as lpr3
+from utils.parallel_catcher import ParallelLicensePlateCatcher
+
+
+@click.command(help="Scaling of ParallelLicensePlateCatcher from 1 to N worker processes.")
+@click.option("-det", "--det", default="low", type=click.Choice(["low", "high"]))
+@click.option("--max-workers", default=os.cpu_count() or 1, type=click.IntRange(min=1))
+@click.option("--step", default=1, type=click.IntRange(min=1), help="Worker count increment.")
+@click.option("-n", "--images", "count", default=200, type=click.IntRange(min=1), help="Images per run.")
+@click.option("--threads", default=1, type=click.IntRange(min=0), help="ORT threads per worker, 0 for auto.")
+@click.option("-o", "--output", default="bench/parallel.json", type=str)
+def main(det, max_workers, step, count, threads, output):
+    level = lpr3.DETECT_LEVEL_LOW if det == "low" else lpr3.DETECT_LEVEL_HIGH
+    images = [image for _, image in load_bench_inputs()]
+    slot_shape = max((image.shape for image in images), key=lambda s: s[0] * s[1])
+    counts = sorted(set([1] + list(range(step, max_workers + 1, step)) + [max_workers]))
+    rows = list()
+    base_fps = None
+    print(f"{'workers':>8}{'fps':>10}{'speedup':>10}{'efficiency':>12}")
+    for workers in counts:
+        with ParallelLicensePlateCatcher(workers=workers, slot_shape=slot_shape, num_threads=threads,
+                                         detect_level=level) as pool:
+            # 预热：等待所有进程加载模型
+            list(pool.map(images[:workers], window=workers))
+            start = time.perf_counter()
+            for _ in pool.map(images[i % len(images)] for i in range(count)):
+                pass
+            elapsed = time.perf_counter() - start
+            restarts = pool.restarts
+        fps = count / elapsed if elapsed > 0 else 0.0
+        base_fps = base_fps or fps
+        speedup = fps / base_fps if base_fps else 0.0
+        rows.append(dict(workers=workers, fps=fps, speedup=speedup, efficiency=speedup / workers,
+                         restarts=restarts))
+        print(f"{workers:>8}{fps:>10.1f}{speedup:>10.2f}{speedup / workers:>12.0%}")
+    save_results(output, dict(det=det, images=count, threads=threads, peak_rss_mb=peak_rss_mb(), results=rows))
+    print(f"结果已保存到: {output}")
+
+
+if __name__ == "__main__":
+    main()
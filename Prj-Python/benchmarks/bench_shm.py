@@ -0,0 +1,123 @@
+"""
+进程间传帧开销对比：multiprocessing.Queue直接传帧（pickle） vs 共享内存帧槽（FrameRing）
+
+预先解码一段视频帧并缩放到指定高度（默认1080p），由主进程循环发送给若干消费进程，
+统计吞吐和单帧传输延迟（发送开始到消费进程拿到可用数组）；--detect时消费进程会对帧做一次检测，
+用于对比传帧开销与320检测本身的耗时。
+
+用法（在Prj-Python目录下）：
+    python -m benchmarks.bench_shm --mode pickle --mode shm --consumers 2
+"""
+import multiprocessing
+import time
+
+import click
+import cv2
+
+from benchmarks.common import extract_video_frames, list_test_videos, save_results, summarize
+
+from utils.shm_ring import FrameRing
+
+
+def _consume(mode, task_q, done_q, ring, detect):
+    catcher = None
+    if detect:
+        import hyperlpr3 as lpr3
+        catcher = lpr3.LicensePlateCatcher(detect_level=lpr3.DETECT_LEVEL_LOW)
+    try:
+        while True:
+            task = task_q.get()
+            if task is None:
+                break
+            if mode == "shm":
+                slot, shape, sent = task
+                frame = ring.view(slot, shape)
+            else:
+                frame, sent = task
+            received = time.perf_counter()
+            if catcher is not None:
+                catcher.detect(frame)
+            if mode == "shm":
+                del frame
+                ring.release(slot)
+            done_q.put((received - sent) * 1000.0)
+    finally:
+        if ring is not None:
+            ring.close()
+
+
+def bench_transport(mode: str, frames: list, count: int, consumers: int, slots: int, detect: bool) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    shape = max((f.shape for f in frames), key=lambda s: s[0] * s[1])
+    ring = FrameRing(slots, shape, ctx=ctx) if mode == "shm" else None
+    # pickle模式用同样大小的有界队列限制在途帧数
+    task_q = ctx.Queue(maxsize=slots)
+    done_q = ctx.Queue()
+    procs = [ctx.Process(target=_consume, args=(mode, task_q, done_q, ring, detect), daemon=True)
+             for _ in range(consumers)]
+    for proc in procs:
+        proc.start()
+    latencies = list()
+    try:
+        # 预热：等待消费进程启动（detect时还包括模型加载）
+        for i in range(consumers):
+            frame = frames[i % len(frames)]
+            if mode == "shm":
+                slot, frame_shape = ring.write(frame)
+                task_q.put((slot, frame_shape, time.perf_counter()))
+            else:
+                task_q.put((frame, time.perf_counter()))
+        for _ in range(consumers):
+            done_q.get()
+
+        start = time.perf_counter()
+        for i in range(count):
+            frame = frames[i % len(frames)]
+            sent = time.perf_counter()
+            if mode == "shm":
+                slot, frame_shape = ring.write(frame)
+                task_q.put((slot, frame_shape, sent))
+            else:
+                task_q.put((frame, sent))
+        for _ in range(count):
+            latencies.append(done_q.get())
+        elapsed = time.perf_counter() - start
+    finally:
+        for _ in procs:
+            task_q.put(None)
+        for proc in procs:
+            proc.join(timeout=30)
+        if ring is not None:
+            ring.close()
+
+    stats = summarize(latencies)
+    return dict(mode=mode, consumers=consumers, detect=detect, frames=count, shape=list(shape),
+                fps=count / elapsed if elapsed > 0 else 0.0, latency_ms=stats)
+
+
+@click.command(help="Cost of moving frames between processes: pickled Queue vs shared-memory ring.")
+@click.option("--mode", "modes", multiple=True, type=click.Choice(["pickle", "shm"]))
+@click.option("--consumers", default=1, type=click.IntRange(min=1))
+@click.option("-n", "--frames", "count", default=500, type=click.IntRange(min=1))
+@click.option("--height", default=1080, type=int, help="Resize frames to this height.")
+@click.option("--slots", default=8, type=click.IntRange(min=1))
+@click.option("--detect/--no-detect", default=False, help="Run the detector on each frame in the consumer.")
+@click.option("-o", "--output", default="bench/shm.json", type=str)
+def main(modes, consumers, count, height, slots, detect, output):
+    frames = list()
+    for video in list_test_videos():
+        frames.extend(extract_video_frames(video, 5))
+    frames = [cv2.resize(f, (int(f.shape[1] * height / f.shape[0]), height)) for f in frames]
+    rows = list()
+    print(f"{'mode':<8}{'consumers':>10}{'fps':>10}{'p50_ms':>10}{'p95_ms':>10}")
+    for mode in modes or ("pickle", "shm"):
+        row = bench_transport(mode, frames, count, consumers, slots, detect)
+        rows.append(row)
+        print(f"{mode:<8}{consumers:>10}{row['fps']:>10.1f}{row['latency_ms']['p50']:>10.2f}"
+              f"{row['latency_ms']['p95']:>10.2f}")
+    save_results(output, dict(results=rows))
+    print(f"结果已保存到: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+hyperlpr3推理链路分阶段微基准
+
+在TestImage下的图片及视频抽帧上，分别统计以下阶段的耗时：
+letterbox预处理、检测模型、post_precessing、get_rotate_crop_image、识别模型、decode、分类模型。
+
+用法（在Prj-Python目录下）：
+    python -m benchmarks.bench_stages -o bench/stages.json
+    python -m benchmarks.bench_stages -o bench/stages_new.json --baseline bench/stages.json
+"""
+import platform
+import sys
+from datetime import datetime
+
+import click
+import numpy as np
+
+from benchmarks.common import StageTimer, load_bench_inputs, save_results, load_results, compare_results
+
+import hyperlpr3 as lpr3
+from hyperlpr3.common.typedef import DOUBLE
+from hyperlpr3.common.tools_process import get_rotate_crop_image
+from hyperlpr3.inference.multitask_detect import detect_pre_precessing, post_precessing
+
+DETECT_LEVELS = {"low": lpr3.DETECT_LEVEL_LOW, "high": lpr3.DETECT_LEVEL_HIGH}
+
+
+def run_stages(catcher, image, timer: StageTimer):
+    """按LPRMultiTaskPipeline.run的流程逐阶段执行并计时"""
+    det = catcher.pipeline.detector
+    rec = catcher.pipeline.recognizer
+    cls = catcher.pipeline.classifier
+
+    with timer.stage("letterbox"):
+        data, r, left, top = detect_pre_precessing(image, det.input_size)
+    with timer.stage("detector"):
+        outputs = det._run_session(data)
+    with timer.stage("post_precessing"):
+        outputs = post_precessing(outputs, r, left, top)
+
+    for out in outputs:
+        land_marks = out[5:13].reshape(4, 2).astype(int)
+        layer_num = int(out[13])
+        with timer.stage("get_rotate_crop_image"):
+            pad = get_rotate_crop_image(image, land_marks)
+        if layer_num == DOUBLE:
+            line = int(pad.shape[0] * 0.4)
+            parts = [pad[:line, :], pad[line:, :]]
+        else:
+            parts = [pad]
+        for part in parts:
+            with timer.stage("recognizer"):
+                tensor = rec._run_session(rec._preprocess(part))
+            with timer.stage("decode"):
+                rec._postprocess(tensor)
+        with timer.stage("classifier"):
+            cls(pad)
+
+
+def bench_level(level: str, inputs: list, repeat: int, warmup: int) -> dict:
+    catcher = lpr3.LicensePlateCatcher(detect_level=DETECT_LEVELS[level])
+    for _ in range(warmup):
+        for _, image in inputs:
+            catcher(image)
+    timer = StageTimer()
+    for _ in range(repeat):
+        for _, image in inputs:
+            run_stages(catcher, image, timer)
+
+    return timer.report()
+
+
+def print_report(results: dict):
+    for level, stages in results.items():
+        print(f"[detect level: {level}]")
+        print(f"  {'stage':<24}{'n':>6}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+        for stage, stats in stages.items():
+            if not stats['n']:
+                continue
+            print(f"  {stage:<24}{stats['n']:>6}{stats['mean']:>10.3f}{stats['p50']:>10.3f}"
+                  f"{stats['p95']:>10.3f}{stats['p99']:>10.3f}")
+
+
+@click.command(help="Micro benchmark of each hyperlpr3 inference stage.")
+@click.option("-o", "--output", default="bench/stages.json", type=str, help="Result JSON file.")
+@click.option("-det", "--det", "levels", default=["low", "high"], multiple=True, type=click.Choice(["low", "high"]))
+@click.option("--video-frames", default=10, type=int, help="Frames extracted from each TestImage video.")
+@click.option("--repeat", default=5, type=int)
+@click.option("--warmup", default=1, type=int)
+@click.option("--baseline", default=None, type=str, help="Baseline JSON to compare with.")
+@click.option("--metric", default="p50", type=click.Choice(["mean", "p50", "p95", "p99"]))
+@click.option("--tolerance", default=0.1, type=float, help="Allowed relative slowdown before flagging.")
+def main(output, levels, video_frames, repeat, warmup, baseline, metric, tolerance):
+    inputs = load_bench_inputs(video_frames)
+    print(f"共加载 {len(inputs)} 张测试图像")
+    results = {level: bench_level(level, inputs, repeat, warmup) for level in levels}
+    print_report(results)
+    save_results(output, dict(
+        meta=dict(
+            time=datetime.now().isoformat(timespec='seconds'),
+            python=platform.python_version(),
+            machine=platform.machine(),
+            processor=platform.processor(),
+            numpy=np.__version__,
+            inputs=len(inputs),
+            repeat=repeat,
+        ),
+        results=results,
+    ))
+    print(f"结果已保存到: {output}")
+
+    if baseline:
+        regressions = compare_results(results, load_results(baseline)['results'], metric, tolerance)
+        if regressions:
+            print(f"发现 {len(regressions)} 项性能退化（{metric}，容差 {tolerance:.0%}）:")
+            for level, stage, base, cur, ratio in regressions:
+                print(f"  [{level}] {stage}: {base:.3f}ms -> {cur:.3f}ms (x{ratio:.2f})")
+            sys.exit(1)
+        print("未发现性能退化")
+
+
+if __name__ == "__main__":
+    main()
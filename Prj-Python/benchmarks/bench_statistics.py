@@ -0,0 +1,176 @@
+"""
+/parking/statistics 聚合查询基准
+
+在临时SQLite库中生成数百万条合成停车记录（3个停车场、约2%的车辆仍在场），
+对比原实现（逐停车场加载ORM对象、Python中求和与按小时分桶）、停车记录上的分组聚合查询与小时汇总表查询的耗时，
+并校验结果一致。
+
+用法（在Prj-Python目录下）：
+    python -m benchmarks.bench_statistics --records 3000000 --days 30 --days 365
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import save_results, summarize
+
+from models.database import Base, ParkingLot, ParkingRecord
+from models.migrations import migrate
+from utils.parking_stats import query_record_statistics, query_statistics
+from utils.rollups import rebuild_rollups
+
+# 与SQLAlchemy在SQLite中保存DateTime的格式一致
+_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def populate(path: str, records: int, span_days: int = 365, seed: int = 0) -> datetime:
+    """生成合成数据，返回数据的结束时间"""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    rng = random.Random(seed)
+    end = datetime(2026, 1, 1)
+    begin = end - timedelta(days=span_days)
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO parking_lots (id, name, capacity, hourly_rate, description, created_at) "
+                     "VALUES (?, ?, ?, ?, ?, ?)",
+                     [(1, "A区停车场", 100, 10.0, None, begin.strftime(_DATETIME_FORMAT)),
+                      (2, "B区停车场", 150, 8.0, None, begin.strftime(_DATETIME_FORMAT)),
+                      (3, "C区地下停车场", 200, 6.0, None, begin.strftime(_DATETIME_FORMAT))])
+    rates = {1: 10.0, 2: 8.0, 3: 6.0}
+    seconds = span_days * 86400
+
+    def rows(count):
+        for i in range(count):
+            lot = rng.randint(1, 3)
+            entry = begin + timedelta(seconds=rng.randrange(seconds))
+            if rng.random() < 0.02:
+                exit_time = duration = fee = None
+            else:
+                duration = rng.uniform(0.1, 8.0)
+                exit_time = (entry + timedelta(hours=duration)).strftime(_DATETIME_FORMAT)
+                fee = duration * rates[lot]
+            yield (rng.randint(1, records // 4 + 1), lot, entry.strftime(_DATETIME_FORMAT), exit_time, duration, fee,
+                   fee is not None)
+
+    chunk = 100000
+    for offset in range(0, records, chunk):
+        conn.executemany("INSERT INTO parking_records (vehicle_id, parking_lot_id, entry_time, exit_time, "
+                         "parking_duration, fee, paid) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         rows(min(chunk, records - offset)))
+        conn.commit()
+    conn.close()
+
+    return end
+
+
+def legacy_statistics(db, start: datetime, end: datetime) -> dict:
+    """原/parking/statistics实现，作为对比基线"""
+    total_vehicles, total_revenue, current = 0, 0.0, 0
+    lot_statistics = []
+    hourly_distribution = {f"{i:02d}": 0 for i in range(24)}
+    for lot in db.query(ParkingLot).all():
+        records = db.query(ParkingRecord).filter(ParkingRecord.parking_lot_id == lot.id,
+                                                 ParkingRecord.entry_time >= start,
+                                                 ParkingRecord.entry_time < end).all()
+        revenue = sum(record.fee or 0 for record in records)
+        occupancy = db.query(ParkingRecord).filter(ParkingRecord.parking_lot_id == lot.id,
+                                                   ParkingRecord.entry_time <= datetime.now(),
+                                                   ParkingRecord.exit_time == None).count()
+        total_vehicles += len(records)
+        total_revenue += revenue
+        current += occupancy
+        lot_statistics.append({"lot_id": lot.id, "lot_name": lot.name, "total_vehicles": len(records),
+                               "total_revenue": revenue, "current_occupancy": occupancy,
+                               "occupancy_rate": occupancy / lot.capacity if lot.capacity > 0 else 0})
+        for record in records:
+            hour = record.entry_time.strftime("%H")
+            hourly_distribution[hour] = hourly_distribution.get(hour, 0) + 1
+    total_duration = sum((record.exit_time - record.entry_time).total_seconds() / 3600
+                         for record in db.query(ParkingRecord).filter(ParkingRecord.entry_time >= start,
+                                                                      ParkingRecord.entry_time < end,
+                                                                      ParkingRecord.exit_time != None).all())
+    return {"total_vehicles": total_vehicles, "total_revenue": total_revenue,
+            "average_duration": total_duration / total_vehicles if total_vehicles > 0 else 0,
+            "current_occupancy": current, "lot_statistics": lot_statistics,
+            "hourly_distribution": hourly_distribution}
+
+
+def same_result(a: dict, b: dict, tol: float = 1e-6) -> bool:
+    """数值按相对误差比较，浮点求和顺序不同会有微小差异"""
+    def close(x, y):
+        return abs(x - y) <= tol * max(abs(x), abs(y), 1.0)
+
+    if a["hourly_distribution"] != b["hourly_distribution"]:
+        return False
+    for key in ("total_vehicles", "total_revenue", "average_duration", "current_occupancy"):
+        if not close(a[key], b[key]):
+            return False
+    for x, y in zip(a["lot_statistics"], b["lot_statistics"]):
+        if any(not close(x[k], y[k]) for k in ("total_vehicles", "total_revenue", "current_occupancy")):
+            return False
+
+    return len(a["lot_statistics"]) == len(b["lot_statistics"])
+
+
+@click.command(help="Legacy per-lot ORM statistics vs grouped SQL aggregates vs hourly rollups on a synthetic table.")
+@click.option("--records", default=3000000, type=click.IntRange(min=1), help="Synthetic parking records.")
+@click.option("--days", "ranges", multiple=True, type=click.IntRange(min=1), help="Query ranges in days, default 1 30 365.")
+@click.option("-n", "--repeat", default=3, type=click.IntRange(min=1), help="Runs per query.")
+@click.option("--db", "db_path", default=None, type=str, help="Reuse/keep the synthetic database at this path.")
+@click.option("--skip-legacy", is_flag=True, help="Only run the aggregate and rollup queries.")
+@click.option("-o", "--output", default="bench/statistics.json", type=str)
+def main(records, ranges, repeat, db_path, skip_legacy, output):
+    keep = db_path is not None
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(), "statistics.db")
+    data_end = datetime(2026, 1, 1)
+    if not os.path.exists(db_path):
+        print(f"生成{records}条合成记录: {db_path}")
+        t0 = time.perf_counter()
+        data_end = populate(db_path, records)
+        print(f"生成耗时 {time.perf_counter() - t0:.1f}s")
+    engine = create_engine(f"sqlite:///{db_path}")
+    migrate(engine)
+    session = sessionmaker(bind=engine)()
+    t0 = time.perf_counter()
+    rollup_rows = rebuild_rollups(session)
+    print(f"重建小时汇总: {rollup_rows}行，{time.perf_counter() - t0:.1f}s")
+    rows = list()
+    print(f"{'days':>6}{'impl':>10}{'p50_ms':>12}{'match':>7}")
+    try:
+        for days in ranges or (1, 30, 365):
+            start, end = data_end - timedelta(days=days), data_end
+            impls = [("aggregate", query_record_statistics), ("rollup", query_statistics)]
+            if not skip_legacy:
+                impls.append(("legacy", legacy_statistics))
+            results = dict()
+            for name, fn in impls:
+                samples = list()
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    results[name] = fn(session, start, end)
+                    samples.append((time.perf_counter() - t0) * 1000.0)
+                    session.expunge_all()
+                stats = summarize(samples)
+                match = same_result(results[name], results["aggregate"])
+                rows.append(dict(days=days, impl=name, latency_ms=stats, match=match))
+                print(f"{days:>6}{name:>10}{stats['p50']:>12.1f}{str(match):>7}")
+    finally:
+        session.close()
+        engine.dispose()
+        if not keep:
+            os.remove(db_path)
+    save_results(output, dict(records=records, results=rows))
+    print(f"结果已保存到: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+端到端视频吞吐基准（无界面）
+
+将TestImage/Video00*.mp4按不同模式完整回放一遍识别流程，统计：
+解码FPS、推理FPS、端到端FPS、单帧延迟p50/p95/p99以及峰值内存，
+并按视频源帧率折算单进程可实时处理的摄像头路数，用于按路数评估硬件配置。
+
+模式参数均可传入多个值，脚本会对所有组合逐一测试：
+    --det      检测级别 low/high
+    --stride   每隔stride帧识别一帧，其余帧只grab不解码像素
+    --batch    每批解码的帧数，批内各帧由batch个识别器并行推理
+    --threads  每个onnxruntime会话的算子内线程数（0为自动）
+
+用法（在Prj-Python目录下）：
+    python -m benchmarks.bench_video --det low --det high --stride 1 --stride 3 --batch 1 --batch 4
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import product
+
+import click
+import cv2
+
+from benchmarks.common import list_test_videos, summarize, peak_rss_mb, save_results
+
+DETECT_LEVELS = ("low", "high")
+
+
+def bench_mode(video: str, det: str, stride: int, batch: int, threads: int, render: bool, max_frames: int) -> dict:
+    import hyperlpr3 as lpr3
+    level = lpr3.DETECT_LEVEL_LOW if det == "low" else lpr3.DETECT_LEVEL_HIGH
+    catchers = [lpr3.LicensePlateCatcher(detect_level=level, num_threads=threads) for _ in range(batch)]
+    if render:
+        from video_recognition import draw_plate_on_image
+
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise ValueError(f"无法打开视频文件: {video}")
+    source_fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+
+    decode_time = 0.0
+    infer_time = 0.0
+    decoded = 0
+    inferred = 0
+    latencies = list()
+    pending = list()
+
+    def flush(pool):
+        nonlocal infer_time, inferred
+        if not pending:
+            return
+        t0 = time.perf_counter()
+        frames = [frame for frame, _ in pending]
+        results = list(pool.map(lambda pair: pair[0](pair[1]), zip(catchers, frames)))
+        if render:
+            for frame, result in zip(frames, results):
+                draw_plate_on_image(frame, result)
+        t1 = time.perf_counter()
+        infer_time += t1 - t0
+        inferred += len(frames)
+        latencies.extend((t1 - start) * 1000.0 for _, start in pending)
+        pending.clear()
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=batch) as pool:
+        try:
+            index = 0
+            while max_frames <= 0 or index < max_frames:
+                t0 = time.perf_counter()
+                if index % stride:
+                    ok, frame = cap.grab(), None
+                else:
+                    ok, frame = cap.read()
+                decode_time += time.perf_counter() - t0
+                if not ok:
+                    break
+                decoded += 1
+                index += 1
+                if frame is not None:
+                    pending.append((frame, t0))
+                    if len(pending) >= batch:
+                        flush(pool)
+            flush(pool)
+        finally:
+            cap.release()
+    wall_time = time.perf_counter() - wall_start
+
+    e2e_fps = decoded / wall_time if wall_time > 0 else 0.0
+    return dict(
+        video=video,
+        det=det,
+        stride=stride,
+        batch=batch,
+        threads=threads,
+        render=render,
+        frames_decoded=decoded,
+        frames_inferred=inferred,
+        decode_fps=decoded / decode_time if decode_time > 0 else 0.0,
+        infer_fps=inferred / infer_time if infer_time > 0 else 0.0,
+        e2e_fps=e2e_fps,
+        source_fps=source_fps,
+        realtime_streams=e2e_fps / source_fps,
+        latency_ms=summarize(latencies),
+        peak_rss_mb=peak_rss_mb(),
+    )
+
+
+def print_row(row: dict):
+    latency = row['latency_ms']
+    rss = f"{row['peak_rss_mb']:.0f}" if row['peak_rss_mb'] is not None else "-"
+    print(f"{row['det']:<5}{row['stride']:>7}{row['batch']:>6}{row['threads']:>8}"
+          f"{row['decode_fps']:>11.1f}{row['infer_fps']:>10.1f}{row['e2e_fps']:>9.1f}"
+          f"{latency.get('p50', 0):>9.1f}{latency.get('p95', 0):>9.1f}{latency.get('p99', 0):>9.1f}"
+          f"{rss:>9}{row['realtime_streams']:>9.2f}")
+
+
+@click.command(help="Headless end-to-end video throughput benchmark.")
+@click.option("-o", "--output", default="bench/video.json", type=str, help="Result JSON file.")
+@click.option("-src", "--src", "videos", multiple=True, type=str, help="Videos to replay, default TestImage/Video00*.mp4.")
+@click.option("-det", "--det", "levels", default=["low"], multiple=True, type=click.Choice(DETECT_LEVELS))
+@click.option("--stride", "strides", default=[1], multiple=True, type=click.IntRange(min=1))
+@click.option("--batch", "batches", default=[1], multiple=True, type=click.IntRange(min=1))
+@click.option("--threads", "threads_list", default=[0], multiple=True, type=click.IntRange(min=0))
+@click.option("--render/--no-render", default=False, help="Draw overlays as process_video does.")
+@click.option("--max-frames", default=0, type=int, help="Stop after N frames per video, 0 for all.")
+@click.option("--isolate/--no-isolate", default=True, help="Run each mode in a fresh process for a clean peak RSS.")
+def main(output, videos, levels, strides, batches, threads_list, render, max_frames, isolate):
+    videos = list(videos) or [str(p) for p in list_test_videos()]
+    modes = list(product(videos, levels, strides, batches, threads_list))
+    print(f"{'det':<5}{'stride':>7}{'batch':>6}{'threads':>8}{'dec_fps':>11}{'inf_fps':>10}{'e2e_fps':>9}"
+          f"{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}{'rss_mb':>9}{'streams':>9}")
+    rows = list()
+    for video, det, stride, batch, threads in modes:
+        args = (video, det, stride, batch, threads, render, max_frames)
+        if isolate:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+                row = executor.submit(bench_mode, *args).result()
+        else:
+            row = bench_mode(*args)
+        print_row(row)
+        rows.append(row)
+    save_results(output, dict(results=rows))
+    print(f"结果已保存到: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import json
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 获取项目根目录的绝对路径
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+TEST_IMAGE_DIR = PROJECT_ROOT.parent / "TestImage"
+
+
+def read_image(path) -> np.ndarray:
+    """读取图片，兼容Windows下的中文路径（TestImage中的文件以车牌号命名）"""
+    data = np.fromfile(str(path), dtype=np.uint8)
+    return cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+
+def list_test_images(folder=TEST_IMAGE_DIR) -> list:
+    return sorted(p for p in Path(folder).iterdir() if p.suffix.lower() in ('.jpg', '.jpeg', '.png', '.bmp'))
+
+
+def list_test_videos(folder=TEST_IMAGE_DIR, pattern="Video00*.mp4") -> list:
+    return sorted(Path(folder).glob(pattern))
+
+
+def extract_video_frames(path, count: int = 10) -> list:
+    """从视频中均匀抽取count帧"""
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        raise ValueError(f"无法打开视频文件: {path}")
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    step = max(total // count, 1) if total > 0 else 1
+    frames = list()
+    index = 0
+    try:
+        while len(frames) < count:
+            ret = cap.grab()
+            if not ret:
+                break
+            if index % step == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    frames.append(frame)
+            index += 1
+    finally:
+        cap.release()
+
+    return frames
+
+
+def load_bench_inputs(video_frames: int = 10) -> list:
+    """返回[(name, image), ...]，包含TestImage下的全部图片以及每个视频抽取的帧"""
+    inputs = list()
+    for path in list_test_images():
+        image = read_image(path)
+        if image is not None:
+            inputs.append((path.name, image))
+    if video_frames > 0:
+        for path in list_test_videos():
+            for idx, frame in enumerate(extract_video_frames(path, video_frames)):
+                inputs.append((f"{path.stem}#{idx}", frame))
+
+    return inputs
+
+
+def summarize(samples: list) -> dict:
+    """将毫秒耗时样本汇总为统计量"""
+    if not samples:
+        return dict(n=0)
+    data = np.asarray(samples, dtype=np.float64)
+    return dict(
+        n=int(data.size),
+        mean=float(data.mean()),
+        min=float(data.min()),
+        max=float(data.max()),
+        p50=float(np.percentile(data, 50)),
+        p95=float(np.percentile(data, 95)),
+        p99=float(np.percentile(data, 99)),
+    )
+
+
+class StageTimer(object):
+    """按阶段名累计耗时样本（毫秒）"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append((time.perf_counter() - t0) * 1000.0)
+
+    def add(self, name: str, ms: float):
+        self.samples[name].append(ms)
+
+    def report(self) -> dict:
+        return {name: summarize(values) for name, values in self.samples.items()}
+
+
+def peak_rss_mb():
+    """当前进程的峰值常驻内存（MB），无法获取时返回None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS返回字节，Linux返回KB
+        return peak / 1024.0 / 1024.0 if sys.platform == 'darwin' else peak / 1024.0
+    except ImportError:
+        pass
+    try:
+        # Windows下没有resource模块，使用psutil提供的peak_wset
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / 1024.0 / 1024.0
+    except ImportError:
+        return None
+
+
+def current_rss_mb():
+    """当前进程的常驻内存（MB），无法获取时返回None"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024.0 / 1024.0
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        import resource
+        return pages * resource.getpagesize() / 1024.0 / 1024.0
+    except (OSError, ImportError):
+        return None
+
+
+def save_results(path, results: dict):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_results(current: dict, baseline: dict, metric: str = 'p50', tolerance: float = 0.1) -> list:
+    """
+    对比两次结果中同名阶段的耗时
+    Args:
+        current/baseline: {group: {stage: stats}}结构的结果
+        metric: 参与比较的统计量
+        tolerance: 允许的相对退化比例
+    Returns:
+        退化项列表 [(group, stage, baseline_value, current_value, ratio), ...]
+    """
+    regressions = list()
+    for group, stages in current.items():
+        for stage, stats in stages.items():
+            base = baseline.get(group, {}).get(stage)
+            if not base or metric not in base or metric not in stats or base[metric] <= 0:
+                continue
+            ratio = stats[metric] / base[metric]
+            if ratio > 1.0 + tolerance:
+                regressions.append((group, stage, base[metric], stats[metric], ratio))
+
+    return regressions
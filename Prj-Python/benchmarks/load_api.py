@@ -0,0 +1,97 @@
+"""
+停车场API负载测试：闸口识别繁忙时，非识别接口的延迟是否保持平稳
+
+先只对/parking/lots做探测得到基线，然后启动若干"闸口"客户端持续向/vehicle/exit上传TestImage图片
+（会完整执行保存与识别；车辆不在库中时返回404，不写数据库），同时继续探测/parking/lots。
+输出两个阶段的探测延迟p50/p95/p99、闸口请求吞吐与状态码分布，以及服务端识别队列指标。
+
+用法（在Prj-Python目录下，先运行 python run.py）：
+    python -m benchmarks.load_api --url http://127.0.0.1:8000 --gates 8 --duration 30
+"""
+import threading
+import time
+from collections import Counter
+
+import click
+import requests
+
+from benchmarks.common import list_test_images, save_results, summarize
+
+
+def probe(url: str, duration: float, interval: float) -> list:
+    """按固定间隔请求/parking/lots，返回延迟样本（毫秒）"""
+    samples = list()
+    session = requests.Session()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        session.get(f"{url}/parking/lots", timeout=30).raise_for_status()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+        time.sleep(max(interval - (time.perf_counter() - t0), 0))
+
+    return samples
+
+
+def gate_client(url: str, images: list, stop: threading.Event, statuses: Counter, latencies: list,
+                lock: threading.Lock):
+    session = requests.Session()
+    i = 0
+    while not stop.is_set():
+        name, data = images[i % len(images)]
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            response = session.post(f"{url}/vehicle/exit", files={"file": (name, data, "image/jpeg")}, timeout=120)
+            status = response.status_code
+        except requests.RequestException:
+            status = "error"
+        with lock:
+            statuses[status] += 1
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+
+
+@click.command(help="p99 latency of non-recognition endpoints while the gate endpoints are busy.")
+@click.option("--url", default="http://127.0.0.1:8000", type=str)
+@click.option("--gates", default=8, type=click.IntRange(min=1), help="Concurrent gate clients.")
+@click.option("--duration", default=30.0, type=float, help="Seconds per phase.")
+@click.option("--interval", default=0.05, type=float, help="Seconds between probe requests.")
+@click.option("-o", "--output", default="bench/load_api.json", type=str)
+def main(url, gates, duration, interval, output):
+    url = url.rstrip("/")
+    images = [(p.name, p.read_bytes()) for p in list_test_images()]
+
+    print(f"基线阶段：仅探测/parking/lots，{duration:.0f}s")
+    baseline = summarize(probe(url, duration, interval))
+
+    print(f"负载阶段：{gates}个闸口客户端 + 探测，{duration:.0f}s")
+    stop = threading.Event()
+    statuses = Counter()
+    gate_latencies = list()
+    lock = threading.Lock()
+    clients = [threading.Thread(target=gate_client, args=(url, images, stop, statuses, gate_latencies, lock),
+                                daemon=True) for _ in range(gates)]
+    for client in clients:
+        client.start()
+    start = time.perf_counter()
+    loaded = summarize(probe(url, duration, interval))
+    metrics = requests.get(f"{url}/metrics/recognition", timeout=30).json()
+    stop.set()
+    for client in clients:
+        client.join(timeout=120)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'phase':<10}{'p50_ms':>10}{'p95_ms':>10}{'p99_ms':>10}")
+    for phase, stats in (("baseline", baseline), ("loaded", loaded)):
+        print(f"{phase:<10}{stats['p50']:>10.1f}{stats['p95']:>10.1f}{stats['p99']:>10.1f}")
+    gate_stats = summarize(gate_latencies)
+    print(f"闸口请求: {sum(statuses.values())}个，{sum(statuses.values()) / elapsed:.1f}req/s，"
+          f"p50 {gate_stats.get('p50', 0):.0f}ms，状态码 {dict(statuses)}")
+    print(f"识别队列: {metrics}")
+    save_results(output, dict(gates=gates, duration=duration, baseline_ms=baseline, loaded_ms=loaded,
+                              gate_ms=gate_stats, gate_status={str(k): v for k, v in statuses.items()},
+                              recognition=metrics))
+    print(f"结果已保存到: {output}")
+
+
+if __name__ == "__main__":
+    main()
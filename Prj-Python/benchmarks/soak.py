@@ -0,0 +1,149 @@
+"""
+长时间运行内存预算/泄漏检测（soak test）
+
+循环读取视频帧，持续执行识别与结果绘制，按固定间隔采样tracemalloc与进程RSS：
+- 预热结束后记录基准快照，结束时输出增长最多的分配位置
+- 以RSS对帧序号做线性拟合得到每帧增长量
+- 每帧增长或总增长超出预算时以退出码1结束，可直接用于CI
+
+用法（在Prj-Python目录下）：
+    python -m benchmarks.soak --iterations 20000 --max-growth-mb 64 --max-per-frame-kb 1
+"""
+import sys
+import time
+import tracemalloc
+
+import click
+import cv2
+import numpy as np
+
+from benchmarks.common import list_test_videos, current_rss_mb, save_results
+
+import hyperlpr3 as lpr3
+
+
+class LoopedFrames(object):
+    """循环读取一组视频，读到末尾后回到开头"""
+
+    def __init__(self, videos: list):
+        if not videos:
+            raise ValueError("没有可用的视频文件")
+        self.videos = videos
+        self.index = 0
+        self.cap = None
+        self._open()
+
+    def _open(self):
+        if self.cap is not None:
+            self.cap.release()
+        self.cap = cv2.VideoCapture(str(self.videos[self.index]))
+        if not self.cap.isOpened():
+            raise ValueError(f"无法打开视频文件: {self.videos[self.index]}")
+
+    def read(self) -> np.ndarray:
+        for _ in range(len(self.videos) + 1):
+            ret, frame = self.cap.read()
+            if ret:
+                return frame
+            self.index = (self.index + 1) % len(self.videos)
+            self._open()
+        raise ValueError("视频中没有可读取的帧")
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
+def top_growth(baseline, snapshot, limit: int) -> list:
+    stats = snapshot.compare_to(baseline, 'lineno')
+    growth = list()
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        growth.append(dict(site=f"{frame.filename}:{frame.lineno}",
+                           size_diff_kb=stat.size_diff / 1024.0,
+                           count_diff=stat.count_diff))
+
+    return growth
+
+
+@click.command(help="Long-run memory budget and leak detection for the recognition pipeline.")
+@click.option("-src", "--src", "videos", multiple=True, type=str, help="Videos to loop, default TestImage/Video00*.mp4.")
+@click.option("-det", "--det", default="low", type=click.Choice(["low", "high"]))
+@click.option("-n", "--iterations", default=5000, type=click.IntRange(min=1), help="Frames to process.")
+@click.option("--warmup", default=200, type=click.IntRange(min=0), help="Frames excluded from the budget.")
+@click.option("--sample-every", default=100, type=click.IntRange(min=1))
+@click.option("--render/--no-render", default=True, help="Draw overlays as process_video does.")
+@click.option("--max-growth-mb", default=64.0, type=float, help="Budget for total RSS growth after warmup.")
+@click.option("--max-per-frame-kb", default=1.0, type=float, help="Budget for RSS growth per frame (fitted slope).")
+@click.option("--traced-frames", default=10, type=int, help="Traceback depth kept by tracemalloc.")
+@click.option("--top", default=10, type=int, help="Allocation sites to report.")
+@click.option("-o", "--output", default="bench/soak.json", type=str)
+def main(videos, det, iterations, warmup, sample_every, render, max_growth_mb, max_per_frame_kb,
+         traced_frames, top, output):
+    level = lpr3.DETECT_LEVEL_LOW if det == "low" else lpr3.DETECT_LEVEL_HIGH
+    catcher = lpr3.LicensePlateCatcher(detect_level=level)
+    if render:
+        from video_recognition import draw_plate_on_image
+    frames = LoopedFrames(list(videos) or list_test_videos())
+
+    tracemalloc.start(traced_frames)
+    # 不预热时以开始前的快照为基线
+    baseline = tracemalloc.take_snapshot() if warmup == 0 else None
+    samples = list()
+    start = time.perf_counter()
+    try:
+        for i in range(1, warmup + iterations + 1):
+            frame = frames.read()
+            result = catcher(frame)
+            if render:
+                frame = draw_plate_on_image(frame, result)
+            if i == warmup:
+                baseline = tracemalloc.take_snapshot()
+            if i > warmup and (i - warmup) % sample_every == 0:
+                traced, _ = tracemalloc.get_traced_memory()
+                samples.append(dict(frame=i - warmup, rss_mb=current_rss_mb(), traced_mb=traced / 1024.0 / 1024.0))
+                print(f"[{i - warmup}/{iterations}] rss: {samples[-1]['rss_mb']:.1f}MB  "
+                      f"traced: {samples[-1]['traced_mb']:.1f}MB")
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        frames.release()
+        tracemalloc.stop()
+    elapsed = time.perf_counter() - start
+    if baseline is None:
+        baseline = snapshot
+
+    rss = [s['rss_mb'] for s in samples if s['rss_mb'] is not None]
+    growth_mb = rss[-1] - rss[0] if len(rss) > 1 else 0.0
+    per_frame_kb = 0.0
+    if len(rss) > 2:
+        x = [s['frame'] for s in samples if s['rss_mb'] is not None]
+        per_frame_kb = float(np.polyfit(x, rss, 1)[0]) * 1024.0
+    sites = top_growth(baseline, snapshot, top)
+
+    print("-" * 50)
+    print(f"共处理 {warmup + iterations} 帧，耗时 {elapsed:.1f}s")
+    print(f"RSS增长: {growth_mb:.2f}MB (预算 {max_growth_mb:.2f}MB)")
+    print(f"每帧增长: {per_frame_kb:.3f}KB (预算 {max_per_frame_kb:.3f}KB)")
+    print("增长最多的分配位置:")
+    for site in sites:
+        print(f"  {site['size_diff_kb']:>10.1f}KB {site['count_diff']:>+8}  {site['site']}")
+
+    failures = list()
+    if growth_mb > max_growth_mb:
+        failures.append("total_growth")
+    if per_frame_kb > max_per_frame_kb:
+        failures.append("per_frame_growth")
+    save_results(output, dict(
+        det=det, iterations=iterations, warmup=warmup, render=render,
+        growth_mb=growth_mb, per_frame_kb=per_frame_kb,
+        budget=dict(max_growth_mb=max_growth_mb, max_per_frame_kb=max_per_frame_kb),
+        failures=failures, top_sites=sites, samples=samples,
+    ))
+    if failures:
+        print(f"超出内存预算: {', '.join(failures)}")
+        sys.exit(1)
+    print("内存预算检查通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import click
 from hyperlpr3.command.aliased_group import AliasedGroup
 from hyperlpr3.command.sample import sample
+from hyperlpr3.command.profile import profile
 from hyperlpr3.command.serve import rest
 
 __all__ = ['cli']
@@ -14,6 +15,7 @@ def cli():
 
 
 cli.add_command(sample)
+cli.add_command(profile)
 cli.add_command(rest)
 
 if __name__ == '__main__':
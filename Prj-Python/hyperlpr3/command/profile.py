@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import hyperlpr3 as lpr3
+import click
+from loguru import logger
+from hyperlpr3.command.sample import get_image
+from hyperlpr3.common.image_decode import decode_full
+from hyperlpr3.common.profiling import summarize_trace, format_report
+
+
+@click.command(help="Profile HyperLPR3 models per operator with onnxruntime.")
+@click.option("-src", "--src", type=str, )
+@click.option("-det", "--det", default='low', type=click.Choice(['low', 'high']), )
+@click.option("-n", "--frames", default=50, type=click.IntRange(min=1), help="Number of frames to profile.")
+@click.option("-top", "--top", default=15, type=int, help="Show top N operators per model, 0 for all.")
+@click.option("-o", "--output", default='profile', type=str, help="Directory for the JSON traces.")
+def profile(src, det, frames, top, output):
+    ret, data = get_image(src)
+    if not ret:
+        return
+    # 逐算子剖析使用全分辨率图像，与直接调用catcher(image)一致
+    image = decode_full(data)
+    if image is None:
+        logger.error("Failed to decode image.")
+        return
+    if det == 'low':
+        level = lpr3.DETECT_LEVEL_LOW
+    else:
+        level = lpr3.DETECT_LEVEL_HIGH
+    catcher = lpr3.LicensePlateCatcher(detect_level=level, profile_frames=frames, profile_dir=output)
+    for _ in range(frames):
+        result = catcher(image)
+    logger.info(f"共检测到车牌: {len(result)}")
+    for name, path in catcher.end_profiling().items():
+        logger.info(f"{name} trace: {path}")
+        print(format_report(name, summarize_trace(path, top=top)))
+        print("--" * 20)
+
+
+if __name__ == "__main__":
+    profile()
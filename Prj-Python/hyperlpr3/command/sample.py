@@ -1,8 +1,6 @@
 # -*- coding: utf-8 -*-
 import hyperlpr3 as lpr3
-import cv2
 import urllib
-import numpy as np
 import re
 import click
 from loguru import logger
@@ -25,40 +23,39 @@ def is_http_url(s):
         return False
 
 
-def url_to_image(url):
+def url_to_bytes(url):
     try:
         resp = urllib.request.urlopen(url)
-        image = np.asarray(bytearray(resp.read()), dtype="uint8")
-        image = cv2.imdecode(image, cv2.IMREAD_COLOR)
+        data = resp.read()
     except Exception as err:
         return None
 
-    return image
+    return data
 
 
 def get_image(path: str):
-    image = None
+    """ read the encoded image, large images are decoded reduced for detection by recognize_encoded. """
+    data = None
     if is_http_url(path):
         # url
-        image = url_to_image(path)
+        data = url_to_bytes(path)
     else:
         # local path
         if path.split('.')[-1].lower() in ('jpg', 'png', 'jpeg', 'bmp',):
-            image = cv2.imread(path)
-    try:
-        h, w, c = image.shape
-    except Exception as err:
+            with open(path, "rb") as f:
+                data = f.read()
+    if not data:
         logger.error("Failed to read image from path or url.")
         return False, None
 
-    return True, image
+    return True, data
 
 
 @click.command(help="Exec HyperLPR3 Test Sample.")
 @click.option("-src", "--src", type=str, )
 @click.option("-det", "--det", default='low', type=click.Choice(['low', 'high']), )
 def sample(src, det):
-    ret, image = get_image(src)
+    ret, data = get_image(src)
     if ret:
         if det == 'low':
             level = lpr3.DETECT_LEVEL_LOW
@@ -66,7 +63,7 @@ def sample(src, det):
             level = lpr3.DETECT_LEVEL_HIGH
         catcher = lpr3.LicensePlateCatcher(detect_level=level)
         print("--" * 20)
-        result = catcher(image)
+        result = catcher.recognize_encoded(data)
         logger.info(f"共检测到车牌: {len(result)}")
         for res in result:
             code, conf, plate_type, box = res
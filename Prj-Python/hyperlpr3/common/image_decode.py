@@ -0,0 +1,75 @@
+import struct
+
+import cv2
+import numpy as np
+
+# 缩小倍数 -> imdecode标志，JPEG解码器可以直接按1/2、1/4输出，不需要先解码全图再缩放
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+}
+
+# JPEG中携带图像尺寸的SOF标记
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def image_size(data: bytes):
+    """
+    只解析文件头获取图像尺寸，支持JPEG与PNG
+    Returns:
+        (width, height)，无法解析时返回None
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        width, height = struct.unpack(">II", data[16:24])
+        return width, height
+    if data[:2] != b"\xff\xd8":
+        return None
+    pos = 2
+    while pos + 9 < len(data):
+        if data[pos] != 0xFF:
+            pos += 1
+            continue
+        marker = data[pos + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+            pos += 1 if marker == 0xFF else 2
+            continue
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        if marker in _SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[pos + 5:pos + 9])
+            return width, height
+        pos += 2 + length
+
+    return None
+
+
+def reduce_factor(width: int, height: int, max_side: int = 1280) -> int:
+    """选择最大的缩小倍数，使缩小后的长边仍不小于max_side"""
+    factor = 1
+    for candidate in (2, 4):
+        if max(width, height) / candidate >= max_side:
+            factor = candidate
+    return factor
+
+
+def decode_full(data: bytes) -> np.ndarray:
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def decode_reduced(data: bytes, max_side: int = 1280):
+    """
+    按图像大小解码一份缩小的图像用于检测
+    Args:
+        data: 编码后的图片字节
+        max_side: 缩小后长边的下限，检测模型输入为640时取1280可保留足够的车牌细节
+    Returns:
+        (image, scale)，scale为原图相对image的放大倍数，无法解码时image为None
+    """
+    # imdecode会按EXIF方向旋转图像，宽高可能与文件头中的互换，因此scale直接取缩小倍数
+    size = image_size(data)
+    factor = reduce_factor(*size, max_side=max_side) if size else 1
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), REDUCED_FLAGS[factor])
+    if image is None or factor == 1:
+        return image, 1.0
+
+    return image, float(factor)
@@ -0,0 +1,66 @@
+import json
+from collections import defaultdict
+
+
+def load_trace(path: str) -> list:
+    with open(path, 'r', encoding='utf-8') as f:
+        events = json.load(f)
+    # 部分版本的onnxruntime会把事件包在traceEvents字段中
+    if isinstance(events, dict):
+        events = events.get('traceEvents', [])
+
+    return events
+
+
+def summarize_trace(path: str, top: int = 0) -> dict:
+    """
+    将onnxruntime的profiling trace按算子类型聚合
+    Args:
+        path: end_profiling()返回的JSON文件路径
+        top: 仅保留耗时最高的前top个算子，0表示全部保留
+    Returns:
+        dict(runs, run_time_ms, kernel_time_ms, ops)，ops按耗时降序排列，
+        每项包含op_name, time_ms, count, share
+    """
+    op_time = defaultdict(int)
+    op_count = defaultdict(int)
+    runs = 0
+    run_time = 0
+    for event in load_trace(path):
+        category = event.get('cat')
+        name = event.get('name', '')
+        if category == 'Session' and name == 'model_run':
+            runs += 1
+            run_time += event.get('dur', 0)
+        elif category == 'Node' and name.endswith('_kernel_time'):
+            op_name = event.get('args', {}).get('op_name', name)
+            op_time[op_name] += event.get('dur', 0)
+            op_count[op_name] += 1
+
+    kernel_time = sum(op_time.values())
+    ops = list()
+    for op_name in sorted(op_time, key=op_time.get, reverse=True):
+        ops.append(dict(op_name=op_name,
+                        time_ms=op_time[op_name] / 1000.0,
+                        count=op_count[op_name],
+                        share=op_time[op_name] / kernel_time if kernel_time > 0 else 0.0))
+    if top > 0:
+        ops = ops[:top]
+
+    return dict(runs=runs, run_time_ms=run_time / 1000.0, kernel_time_ms=kernel_time / 1000.0, ops=ops)
+
+
+def format_report(model_name: str, summary: dict) -> str:
+    lines = list()
+    runs = summary['runs']
+    per_run = summary['run_time_ms'] / runs if runs > 0 else 0.0
+    lines.append(f"[{model_name}] runs: {runs}  total: {summary['run_time_ms']:.2f}ms  "
+                 f"per run: {per_run:.3f}ms  kernel: {summary['kernel_time_ms']:.2f}ms")
+    if not summary['ops']:
+        lines.append("  (no operator events)")
+        return "\n".join(lines)
+    lines.append(f"  {'#':>3}  {'op':<24}{'time(ms)':>12}{'count':>10}{'share':>9}")
+    for idx, op in enumerate(summary['ops'], 1):
+        lines.append(f"  {idx:>3}  {op['op_name']:<24}{op['time_ms']:>12.3f}{op['count']:>10}{op['share']:>9.1%}")
+
+    return "\n".join(lines)
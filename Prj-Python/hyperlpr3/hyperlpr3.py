@@ -1,13 +1,28 @@
 from .config.settings import onnx_runtime_config as ort_cfg
 from .inference.pipeline import LPRMultiTaskPipeline
 from .common.typedef import *
+import os
 from os.path import join
 from .config.settings import _DEFAULT_FOLDER_
 from .config.configuration import initialization
+from .common.image_decode import decode_reduced, decode_full
 
 
 initialization()
 
+
+def _session_options(profile_prefix: str = None, num_threads: int = 0):
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    if num_threads > 0:
+        options.intra_op_num_threads = num_threads
+    if profile_prefix:
+        options.enable_profiling = True
+        options.profile_file_prefix = profile_prefix
+
+    return options
+
+
 class LicensePlateCatcher(object):
 
     def __init__(self,
@@ -15,7 +30,20 @@ class LicensePlateCatcher(object):
                  folder: str = _DEFAULT_FOLDER_,
                  detect_level: int = DETECT_LEVEL_LOW,
                  logger_level: int = 3,
-                 full_result: bool = False):
+                 full_result: bool = False,
+                 profile_frames: int = 0,
+                 profile_dir: str = "profile",
+                 num_threads: int = 0):
+        """
+        初始化车牌识别器
+        Args:
+            profile_frames: 大于0时开启onnxruntime逐算子性能分析，采集该帧数后自动结束并写出JSON trace
+            profile_dir: 性能分析trace文件的输出目录
+            num_threads: 每个onnxruntime会话的算子内线程数，0表示由onnxruntime自动决定
+        """
+        self.profile_frames = profile_frames
+        self.profile_files = dict()
+        self._profiled_frames = 0
         if inference == INFER_ONNX_RUNTIME:
             from hyperlpr3.inference.multitask_detect import MultiTaskDetectorORT
             from hyperlpr3.inference.recognition import PPRCNNRecognitionORT
@@ -23,18 +51,100 @@ class LicensePlateCatcher(object):
             import onnxruntime as ort
             ort.set_default_logger_severity(logger_level)
 
+            if profile_frames > 0:
+                os.makedirs(profile_dir, exist_ok=True)
+                det_opt = _session_options(join(profile_dir, "detector"), num_threads)
+                rec_opt = _session_options(join(profile_dir, "recognizer"), num_threads)
+                cls_opt = _session_options(join(profile_dir, "classifier"), num_threads)
+            else:
+                det_opt = _session_options(num_threads=num_threads)
+                rec_opt = _session_options(num_threads=num_threads)
+                cls_opt = _session_options(num_threads=num_threads)
+
             if detect_level == DETECT_LEVEL_LOW:
                 # print(join(folder, ort_cfg['det_model_path_320x']))
-                det = MultiTaskDetectorORT(join(folder, ort_cfg['det_model_path_320x']), input_size=(320, 320))
+                det = MultiTaskDetectorORT(join(folder, ort_cfg['det_model_path_320x']), input_size=(320, 320),
+                                           sess_options=det_opt)
             elif detect_level == DETECT_LEVEL_HIGH:
-                det = MultiTaskDetectorORT(join(folder, ort_cfg['det_model_path_640x']), input_size=(640, 640))
+                det = MultiTaskDetectorORT(join(folder, ort_cfg['det_model_path_640x']), input_size=(640, 640),
+                                           sess_options=det_opt)
             else:
                 raise NotImplemented
-            rec = PPRCNNRecognitionORT(join(folder, ort_cfg['rec_model_path']), input_size=(48, 160))
-            cls = ClassificationORT(join(folder, ort_cfg['cls_model_path']), input_size=(96, 96))
+            rec = PPRCNNRecognitionORT(join(folder, ort_cfg['rec_model_path']), input_size=(48, 160),
+                                       sess_options=rec_opt)
+            cls = ClassificationORT(join(folder, ort_cfg['cls_model_path']), input_size=(96, 96),
+                                    sess_options=cls_opt)
             self.pipeline = LPRMultiTaskPipeline(detector=det, recognizer=rec, classifier=cls, full_result=full_result)
         else:
             raise NotImplemented
 
+    def end_profiling(self) -> dict:
+        """
+        结束性能分析，重复调用返回同一结果
+        Returns:
+            各模型的trace文件路径 {"detector": path, "recognizer": path, "classifier": path}
+        """
+        if self.profile_frames > 0 and not self.profile_files:
+            for name in ("detector", "recognizer", "classifier"):
+                model = getattr(self.pipeline, name)
+                self.profile_files[name] = model.session.end_profiling()
+
+        return self.profile_files
+
+    def detect(self, image: np.ndarray) -> np.ndarray:
+        """
+        仅执行车牌检测
+        Returns:
+            N x 14的检测结果，每行为[x1, y1, x2, y2, score, 4个角点的8个坐标, 单双层标记]
+        """
+        return self.pipeline.detect(image)
+
+    def recognize(self, image: np.ndarray, detection: np.ndarray):
+        """
+        对detect()返回的单行检测结果做矫正、识别与分类，用于只对部分检测框识别的场景（如视频跟踪）
+        Returns:
+            与__call__中单个车牌相同格式的结果，不是有效车牌时返回None
+        """
+        return self.pipeline.recognize(image, detection)
+
+    def batch(self, images: list, scales: list = None, loaders: list = None) -> list:
+        """
+        批量识别多张图片，模型支持动态batch时检测与识别各合并为一次推理
+        Args:
+            scales/loaders: 可选，每张图片的缩小倍数与原图加载函数，含义同run_scaled
+        Returns:
+            与images一一对应的结果列表，每项与__call__的返回格式相同
+        """
+        return self.pipeline.run_batch(images, scales, loaders)
+
+    def run_scaled(self, image: np.ndarray, scale: float = 1.0, load_full=None) -> list:
+        """
+        在缩小的图像上检测，用于大尺寸图片只解码缩小版本的场景（见hyperlpr3.common.image_decode）
+        Args:
+            image: 缩小后的图像
+            scale: 原图相对image的放大倍数
+            load_full: 返回原图的无参函数，只在车牌在缩小图上过小时调用，用原图做透视矫正裁剪
+        Returns:
+            与__call__相同格式的结果，坐标换算到原图
+        """
+        return self.pipeline.run_scaled(image, scale, load_full)
+
+    def recognize_encoded(self, data: bytes, max_side: int = 1280) -> list:
+        """
+        直接识别编码后的图片字节（JPEG/PNG），大图按尺寸以IMREAD_REDUCED_COLOR_2/4解码后检测
+        Returns:
+            与__call__相同格式的结果，坐标为原图坐标
+        """
+        image, scale = decode_reduced(data, max_side)
+        if image is None:
+            return []
+        return self.run_scaled(image, scale, lambda: decode_full(data))
+
     def __call__(self, image: np.ndarray, *args, **kwargs):
-        return self.pipeline(image)
+        result = self.pipeline(image)
+        if self.profile_frames > 0 and not self.profile_files:
+            self._profiled_frames += 1
+            if self._profiled_frames >= self.profile_frames:
+                self.end_profiling()
+
+        return result
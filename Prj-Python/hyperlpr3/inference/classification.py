@@ -17,10 +17,10 @@ def encode_images(image: np.ndarray):
 
 class ClassificationORT(HamburgerABC):
 
-    def __init__(self, onnx_path, *args, **kwargs):
+    def __init__(self, onnx_path, sess_options=None, *args, **kwargs):
         import onnxruntime as ort
         super().__init__(*args, **kwargs)
-        self.session = ort.InferenceSession(onnx_path, None)
+        self.session = ort.InferenceSession(onnx_path, sess_options)
         self.input_config = self.session.get_inputs()[0]
         self.output_config = self.session.get_outputs()[0]
         self.input_size = tuple(self.input_config.shape[2:])
@@ -255,19 +255,21 @@ class MultiTaskDetectorORT(HamburgerABC):
     多任务检测器基类
     """
 
-    def __init__(self, onnx_path, box_threshold: float = 0.5, nms_threshold: float = 0.6, *args, **kwargs):
+    def __init__(self, onnx_path, box_threshold: float = 0.5, nms_threshold: float = 0.6, sess_options=None,
+                 *args, **kwargs):
         """
         初始化ONNX检测器
         Args:
             onnx_path: ONNX模型路径
             box_threshold: 检测框置信度阈值
             nms_threshold: NMS阈值
+            sess_options: onnxruntime.SessionOptions，为None时使用默认配置
         """
         super().__init__(*args, **kwargs)
         import onnxruntime as ort
         self.box_threshold = box_threshold
         self.nms_threshold = nms_threshold
-        self.session = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+        self.session = ort.InferenceSession(onnx_path, sess_options=sess_options, providers=['CPUExecutionProvider'])
         self.inputs_option = self.session.get_inputs()
         self.outputs_option = self.session.get_outputs()
         input_option = self.inputs_option[0]
@@ -289,6 +291,26 @@ class MultiTaskDetectorORT(HamburgerABC):
         """
         return self.session.run([self.outputs_option[0].name], {self.input_name: data})[0]
 
+    def detect_batch(self, images: list) -> list:
+        """
+        批量检测
+        模型输入的batch维为动态时合并为一次推理，否则逐张推理；不使用tmp_pack，可与__call__交替调用
+        Args:
+            images: BGR图像列表
+        Returns:
+            与images一一对应的检测结果列表
+        """
+        packs = [detect_pre_precessing(image, self.input_size) for image in images]
+        if not packs:
+            return []
+        if isinstance(self.inputs_option[0].shape[0], int):
+            outputs = [self._run_session(data) for data, _, _, _ in packs]
+        else:
+            merged = self._run_session(np.concatenate([data for data, _, _, _ in packs], axis=0))
+            outputs = [merged[i:i + 1] for i in range(len(packs))]
+
+        return [post_precessing(out, r, left, top) for out, (_, r, left, top) in zip(outputs, packs)]
+
     def _postprocess(self, data):
         """
         后处理函数
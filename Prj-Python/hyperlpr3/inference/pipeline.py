@@ -6,61 +6,142 @@ from hyperlpr3.common.tools_process import *
 
 class LPRMultiTaskPipeline(object):
 
+    # plates lower than this on a reduced image are cropped from the full resolution image (recognizer input height)
+    min_crop_height = 48
+
     def __init__(self, detector, recognizer, classifier, full_result=False):
         self.detector = detector
         self.recognizer = recognizer
         self.classifier = classifier
         self.full_result = full_result
 
-    def run(self, image: np.ndarray) -> list:
-        result = list()
+    def detect(self, image: np.ndarray) -> np.ndarray:
         assert len(image.shape) == 3, "Input image must be 3 channels."
         assert image is not None, "Input image cannot be empty."
-        outputs = self.detector(image)
-        for out in outputs:
-            rect = out[:4].astype(int)
-            score = out[4]
-            land_marks = out[5:13].reshape(4, 2).astype(int)
-            layer_num = int(out[13])
-            # print(layer_num)
-            pad = get_rotate_crop_image(image, land_marks)
-            if layer_num == DOUBLE:
-                # double
-                h, w, _ = pad.shape
-                line = int(h * 0.4)
-                top = pad[:line, :, ]
-                bottom = pad[line:, :]
-                top_code, top_confidence = self.recognizer(top)
-                bottom_code, bottom_confidence = self.recognizer(bottom)
-                plate_code = top_code + bottom_code
-                rec_confidence = (top_confidence + bottom_confidence) / 2
-                # cv2.imshow("top", top)
-                # cv2.imshow("bottom", bottom)
-                # cv2.waitKey(0)
-            else:
-                plate_code, rec_confidence = self.recognizer(pad)
-            if plate_code == '':
-                continue
-            if len(plate_code) >= 7:
-                plate_type = code_filter(plate_code)
-                if plate_type == UNKNOWN:
-                    cls = self.classifier(pad)
-                    idx = int(np.argmax(cls))
-                    if idx == PLATE_TYPE_YELLOW:
-                        if layer_num == DOUBLE:
-                            plate_type = YELLOW_DOUBLE
-                        else:
-                            plate_type = YELLOW_SINGLE
-                    elif idx == PLATE_TYPE_BLUE:
-                        plate_type = BLUE
-                    elif idx == PLATE_TYPE_GREEN:
-                        plate_type = GREEN
-                plate = Plate(vertex=land_marks, plate_code=plate_code, det_bound_box=np.asarray(rect),
-                              rec_confidence=rec_confidence, dex_bound_confidence=score, plate_type=plate_type)
-                if self.full_result:
-                    result.append(plate.to_full_result())
+        return self.detector(image)
+
+    def _crop(self, image: np.ndarray, out: np.ndarray):
+        """ rectify the plate of a detection row, double layer plates are split into top and bottom parts. """
+        rect = out[:4].astype(int)
+        score = out[4]
+        land_marks = out[5:13].reshape(4, 2).astype(int)
+        layer_num = int(out[13])
+        # print(layer_num)
+        pad = get_rotate_crop_image(image, land_marks)
+        if layer_num == DOUBLE:
+            # double
+            h, w, _ = pad.shape
+            line = int(h * 0.4)
+            parts = [pad[:line, :, ], pad[line:, :]]
+        else:
+            parts = [pad]
+
+        return rect, score, land_marks, layer_num, pad, parts
+
+    def _crop_scaled(self, image: np.ndarray, out: np.ndarray, scale: float, load_full, cache: dict):
+        """ crop a detection found on an image reduced by `scale`, coordinates are mapped back to the full image.
+        small plates are cropped from the full image returned by load_full(), which is called at most once. """
+        if scale != 1.0 and load_full is not None and out[3] - out[1] < self.min_crop_height:
+            if "full" not in cache:
+                cache["full"] = load_full()
+            if cache["full"] is not None:
+                full_out = out.astype(np.float32)
+                full_out[:4] *= scale
+                full_out[5:13] *= scale
+                return self._crop(cache["full"], full_out)
+        rect, score, land_marks, layer_num, pad, parts = self._crop(image, out)
+        if scale != 1.0:
+            rect = (rect * scale).astype(int)
+            land_marks = (land_marks * scale).astype(int)
+
+        return rect, score, land_marks, layer_num, pad, parts
+
+    def recognize(self, image: np.ndarray, out: np.ndarray):
+        """ recognize a single detection row from detect(), return None if it is not a valid plate. """
+        rect, score, land_marks, layer_num, pad, parts = self._crop(image, out)
+        readings = [self.recognizer(part) for part in parts]
+
+        return self._assemble(rect, score, land_marks, layer_num, pad, readings)
+
+    def _assemble(self, rect, score, land_marks, layer_num, pad, readings):
+        """ merge the readings of the plate parts, classify the plate type and build the result. """
+        plate_code = ''.join(code for code, _ in readings)
+        rec_confidence = sum(confidence for _, confidence in readings) / len(readings)
+        if len(plate_code) < 7:
+            return None
+        plate_type = code_filter(plate_code)
+        if plate_type == UNKNOWN:
+            cls = self.classifier(pad)
+            idx = int(np.argmax(cls))
+            if idx == PLATE_TYPE_YELLOW:
+                if layer_num == DOUBLE:
+                    plate_type = YELLOW_DOUBLE
                 else:
-                    result.append(plate.to_result())
+                    plate_type = YELLOW_SINGLE
+            elif idx == PLATE_TYPE_BLUE:
+                plate_type = BLUE
+            elif idx == PLATE_TYPE_GREEN:
+                plate_type = GREEN
+        plate = Plate(vertex=land_marks, plate_code=plate_code, det_bound_box=np.asarray(rect),
+                      rec_confidence=rec_confidence, dex_bound_confidence=score, plate_type=plate_type)
+        if self.full_result:
+            return plate.to_full_result()
+        else:
+            return plate.to_result()
+
+    def run_scaled(self, image: np.ndarray, scale: float = 1.0, load_full=None) -> list:
+        """ detect on an image reduced by `scale` (e.g. decoded with IMREAD_REDUCED_COLOR_2), results are in full
+        image coordinates. load_full() decodes the full resolution image, only needed for small plates. """
+        result = list()
+        cache = dict()
+        for out in self.detect(image):
+            crop = self._crop_scaled(image, out, scale, load_full, cache)
+            readings = [self.recognizer(part) for part in crop[-1]]
+            plate = self._assemble(*crop[:-1], readings)
+            if plate is not None:
+                result.append(plate)
+
+        return result
+
+    def run_batch(self, images: list, scales: list = None, loaders: list = None) -> list:
+        """ run a batch of images, detection and recognition are each batched when the models support it.
+        scales/loaders optionally give, per image, the reduction factor and full image loader as in run_scaled. """
+        if hasattr(self.detector, "detect_batch"):
+            detections = self.detector.detect_batch(images)
+        else:
+            detections = [self.detect(image) for image in images]
+        crops = list()
+        owners = list()
+        caches = [dict() for _ in images]
+        for idx, (image, outputs) in enumerate(zip(images, detections)):
+            for out in outputs:
+                crops.append(self._crop_scaled(image, out, scales[idx] if scales else 1.0,
+                                               loaders[idx] if loaders else None, caches[idx]))
+                owners.append(idx)
+        parts = [part for crop in crops for part in crop[-1]]
+        if hasattr(self.recognizer, "recognize_batch"):
+            readings = self.recognizer.recognize_batch(parts)
+        else:
+            readings = [self.recognizer(part) for part in parts]
+
+        results = [list() for _ in images]
+        pos = 0
+        for idx, crop in zip(owners, crops):
+            count = len(crop[-1])
+            plate = self._assemble(*crop[:-1], readings[pos:pos + count])
+            pos += count
+            if plate is not None:
+                results[idx].append(plate)
+
+        return results
+
+    def run(self, image: np.ndarray) -> list:
+        result = list()
+        outputs = self.detect(image)
+        for out in outputs:
+            plate = self.recognize(image, out)
+            if plate is not None:
+                result.append(plate)
 
         return result
 
@@ -109,10 +109,10 @@ class PPRCNNRecognitionMNN(HamburgerABC):
 
 class PPRCNNRecognitionORT(HamburgerABC):
 
-    def __init__(self, onnx_path, token_dict=token, *args, **kwargs):
+    def __init__(self, onnx_path, token_dict=token, sess_options=None, *args, **kwargs):
         import onnxruntime as ort
         super().__init__(*args, **kwargs)
-        self.session = ort.InferenceSession(onnx_path, None)
+        self.session = ort.InferenceSession(onnx_path, sess_options)
         self.input_config = self.session.get_inputs()[0]
         self.output_config = self.session.get_outputs()[0]
         self.input_size = self.input_config.shape[2:]
@@ -173,6 +173,25 @@ class PPRCNNRecognitionORT(HamburgerABC):
 
         return data
 
+    def recognize_batch(self, images: list) -> list:
+        """
+        批量识别车牌裁剪图，按批内最大宽高比统一填充宽度后合并为一次推理；
+        模型输入的batch维固定时逐张识别
+        Returns:
+            [(code, confidence), ...]
+        """
+        if not images:
+            return []
+        if isinstance(self.input_config.shape[0], int):
+            return [self(image) for image in images]
+        max_wh_ratio = max(image.shape[1] * 1.0 / image.shape[0] for image in images)
+        data = np.stack([encode_images(image, max_wh_ratio, self.input_size) for image in images])
+        prod = self._run_session(data)[0]
+        argmax = np.argmax(prod, axis=2)
+        rmax = np.max(prod, axis=2)
+
+        return self.decode(argmax, rmax, is_remove_duplicate=True)
+
 
 class PPRCNNRecognitionDNN(HamburgerABC):
 
@@ -3,6 +3,8 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
 
+from models.migrations import migrate
+
 Base = declarative_base()
 
 class User(Base):
@@ -49,6 +51,7 @@ class ParkingRecord(Base):
     parking_duration = Column(Float)  # 小时
     fee = Column(Float)
     paid = Column(Boolean, default=False)
+    # 证据图片的内容哈希（SHA-256），图片由utils.evidence_store.EvidenceStore保存
     entry_image = Column(String(200))
     exit_image = Column(String(200))
     created_at = Column(DateTime, default=datetime.now)
@@ -57,6 +60,18 @@ class ParkingRecord(Base):
     parking_lot = relationship("ParkingLot", back_populates="parking_records")
     user = relationship("User", back_populates="parking_records")
 
+class ParkingHourlyStat(Base):
+    """按停车场、按小时汇总的停车数据，随入场/出场在同一事务中增量更新，统计与月报直接读取"""
+    __tablename__ = 'parking_hourly_stats'
+
+    parking_lot_id = Column(Integer, ForeignKey('parking_lots.id'), primary_key=True)
+    # 入场时间所在整点，一次停车的全部数据都计入其入场小时
+    hour = Column(DateTime, primary_key=True)
+    entries = Column(Integer, nullable=False, default=0)
+    exits = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    total_duration = Column(Float, nullable=False, default=0.0)  # 小时
+
 # 创建数据库引擎
 engine = create_engine('sqlite:///parking_system.db')
 SessionLocal = sessionmaker(bind=engine)
@@ -68,6 +83,8 @@ def init_db():
     try:
         # 创建所有表
         Base.metadata.create_all(engine)
+        # 执行索引等结构迁移
+        migrate(engine)
         
         # 添加默认停车场数据
         session = SessionLocal()
@@ -0,0 +1,174 @@
+"""
+数据库结构迁移
+
+表由Base.metadata.create_all创建，索引等后续结构变更按版本号写在MIGRATIONS中，
+已执行的版本记录在schema_version表，每个版本在一个事务中执行。init_db在建表后自动执行未完成的迁移。
+
+在Prj-Python目录下手动执行，或检查热点查询的执行计划是否使用索引：
+    python -m models.migrations
+    python -m models.migrations --check
+"""
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+# (版本号, 说明, SQL语句列表)，只能追加，不能修改已发布的版本
+MIGRATIONS = [
+    (1, "parking_records hot query indexes", [
+        # 按入场时间范围筛选与排序（记录查询、统计），id使(entry_time, id)游标分页也能走索引
+        "CREATE INDEX IF NOT EXISTS ix_parking_records_entry_time ON parking_records (entry_time, id)",
+        # 按停车场筛选的时间范围查询
+        "CREATE INDEX IF NOT EXISTS ix_parking_records_lot_entry_time ON parking_records (parking_lot_id, entry_time)",
+        # 出场时查找车辆未完成的停车记录，部分索引只包含在场车辆
+        "CREATE INDEX IF NOT EXISTS ix_parking_records_open_vehicle ON parking_records (vehicle_id) "
+        "WHERE exit_time IS NULL",
+        # 各停车场在场车辆数
+        "CREATE INDEX IF NOT EXISTS ix_parking_records_open_lot ON parking_records (parking_lot_id, entry_time) "
+        "WHERE exit_time IS NULL",
+        # 按入场时间排序的在场车辆列表
+        "CREATE INDEX IF NOT EXISTS ix_parking_records_open_entry_time ON parking_records (entry_time, id) "
+        "WHERE exit_time IS NULL",
+    ]),
+    (2, "parking_hourly_stats hour index", [
+        "CREATE INDEX IF NOT EXISTS ix_parking_hourly_stats_hour ON parking_hourly_stats (hour)",
+    ]),
+]
+
+# hot_queries中每个查询应使用的索引，以及是否允许按该索引整体扫描：
+# 只有读取全部在场车辆的查询可以扫描只含在场车辆的部分索引，其余查询必须是SEARCH
+HOT_QUERY_INDEXES = {
+    "vehicle_exit: open record of vehicle": ("ix_parking_records_open_vehicle", False),
+    "parking_records: date range": ("ix_parking_records_entry_time", False),
+    "parking_records: keyset page": ("ix_parking_records_entry_time", False),
+    "parking_records: parked": ("ix_parking_records_open_entry_time", True),
+    "occupancy: reconcile": ("ix_parking_records_open_lot", True),
+    "statistics: rollups by lot": ("ix_parking_hourly_stats_hour", False),
+    "statistics: rollups by hour": ("ix_parking_hourly_stats_hour", False),
+}
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, description VARCHAR(200), applied_at DATETIME)"
+    ))
+
+
+def current_version(engine) -> int:
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def migrate(engine) -> list:
+    """
+    执行未完成的迁移
+    Returns:
+        本次执行的版本号列表
+    """
+    applied = list()
+    version = current_version(engine)
+    for number, description, statements in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+            conn.execute(text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+                         dict(v=number, d=description, t=datetime.now()))
+        applied.append(number)
+
+    return applied
+
+
+def hot_queries(db) -> dict:
+    """
+    各接口的热点查询，由api/parking_api.py与utils中实际使用的查询构造函数生成
+    Args:
+        db: 绑定到待检查数据库的会话，只用于构造查询
+    Returns:
+        {查询名: SQLAlchemy查询}
+    """
+    from utils.parking_records import after_cursor, open_record_query, records_query
+    from utils.parking_stats import hourly_rollups_query, lot_rollups_query, occupancy_query
+
+    now = datetime.now()
+    start = now - timedelta(days=30)
+    today, month_ago = now.strftime("%Y-%m-%d"), start.strftime("%Y-%m-%d")
+    return {
+        "vehicle_exit: open record of vehicle": open_record_query(db, 1).limit(1),
+        "parking_records: date range": records_query(db, month_ago, today, None, None),
+        "parking_records: keyset page": after_cursor(records_query(db, None, None, None, None), now, 1).limit(101),
+        "parking_records: parked": records_query(db, None, None, None, "在场"),
+        "occupancy: reconcile": occupancy_query(db, now),
+        "statistics: rollups by lot": lot_rollups_query(db, start, now),
+        "statistics: rollups by hour": hourly_rollups_query(db, start, now),
+    }
+
+
+def explain(engine, query) -> list:
+    """返回查询的EXPLAIN QUERY PLAN的每一步说明，参数以字面值编译进SQL"""
+    sql = str(query.statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        return [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+def uses_index(plan: list, index: str, allow_scan: bool = False) -> bool:
+    """
+    执行计划是否使用了index，且没有全表扫描
+    Args:
+        plan: explain()返回的执行计划
+        index: 应使用的索引名
+        allow_scan: 是否允许按index整体扫描（SCAN ... USING INDEX index），其他SCAN一律算全表扫描
+    """
+    used = False
+    for step in plan:
+        by_index = " INDEX " in step and step.split(" INDEX ")[-1].split(" ")[0] == index
+        used = used or by_index
+        if step.startswith("SCAN ") and not (allow_scan and by_index):
+            return False
+    return used
+
+
+def check_query_plans(engine) -> dict:
+    """
+    检查hot_queries的执行计划是否使用HOT_QUERY_INDEXES中对应的索引
+    Returns:
+        {查询名: (是否使用预期索引且无全表扫描, 执行计划)}
+    """
+    results = dict()
+    db = sessionmaker(bind=engine)()
+    try:
+        for name, query in hot_queries(db).items():
+            plan = explain(engine, query)
+            index, allow_scan = HOT_QUERY_INDEXES[name]
+            results[name] = (uses_index(plan, index, allow_scan), plan)
+    finally:
+        db.close()
+
+    return results
+
+
+@click.command(help="Apply pending schema migrations, or check that the hot queries use indexes.")
+@click.option("--check", is_flag=True, help="Print EXPLAIN QUERY PLAN of the hot queries, exit 1 unless each uses its expected index.")
+def main(check):
+    from models.database import engine
+
+    applied = migrate(engine)
+    print(f"数据库版本: {current_version(engine)}，本次执行: {applied or '无'}")
+    if not check:
+        return
+    failed = False
+    for name, (indexed, plan) in check_query_plans(engine).items():
+        failed = failed or not indexed
+        print(f"[{'OK' if indexed else 'FAIL'}] {name}（预期索引: {HOT_QUERY_INDEXES[name][0]}）")
+        for step in plan:
+            print(f"    {step}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+多路视频流共享推理池
+
+每路视频源（文件或rtsp/http等流地址）由独立线程解码，帧放入各自的有界缓冲区；
+固定数量的推理线程（每个线程持有独立的LicensePlateCatcher）按轮询方式从各路缓冲区取帧，
+避免单路高帧率视频占满推理资源。过载时各路按自己的丢帧策略处理：
+- oldest: 缓冲区满时丢弃最旧的帧，始终处理最新画面（适合实时流）
+- newest: 缓冲区满时丢弃新解码的帧
+- block:  不丢帧，解码线程等待（适合离线文件）
+
+定期输出每路的解码/处理/丢帧数、缓冲积压和延迟（解码完成到推理完成）。
+
+用法（在Prj-Python目录下）：
+    python multi_stream.py ../TestImage/Video001.mp4 ../TestImage/Video002.mp4 -w 2 --realtime
+"""
+import threading
+import time
+from collections import deque
+
+import click
+import cv2
+
+import hyperlpr3 as lpr3
+from utils.parallel_catcher import ParallelLicensePlateCatcher
+from video_recognition import PlateEventWriter
+
+DROP_OLDEST = "oldest"
+DROP_NEWEST = "newest"
+DROP_BLOCK = "block"
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST, DROP_BLOCK)
+
+# 置信度阈值，与process_video一致
+CONFIDENCE_THRESHOLD = 0.99
+
+
+class StreamState(object):
+    """单路视频源的缓冲区与统计"""
+
+    def __init__(self, stream_id: int, source: str, buffer_size: int = 4, drop_policy: str = DROP_OLDEST):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"不支持的丢帧策略: {drop_policy}")
+        self.stream_id = stream_id
+        self.source = source
+        self.buffer_size = max(int(buffer_size), 1)
+        self.drop_policy = drop_policy
+        self.buffer = deque()
+        self.closed = False
+        self.fps = 0.0
+        self.decoded = 0
+        self.processed = 0
+        self.dropped = 0
+        self.last_index = -1
+        self.lag_sum = 0.0
+        self.lag_max = 0.0
+        self.last_lag = 0.0
+        self.printed_plates = set()
+
+    def record(self, index: int, lag: float):
+        self.processed += 1
+        self.last_index = max(self.last_index, index)
+        self.lag_sum += lag
+        self.lag_max = max(self.lag_max, lag)
+        self.last_lag = lag
+
+    def metrics(self) -> dict:
+        return dict(
+            stream=self.stream_id,
+            source=self.source,
+            decoded=self.decoded,
+            processed=self.processed,
+            dropped=self.dropped,
+            backlog=len(self.buffer),
+            # 已解码但尚未处理（含丢弃）的帧数
+            frame_lag=max(self.decoded - 1 - self.last_index, 0) if self.decoded else 0,
+            lag_ms=self.last_lag * 1000.0,
+            mean_lag_ms=self.lag_sum * 1000.0 / self.processed if self.processed else 0.0,
+            max_lag_ms=self.lag_max * 1000.0,
+        )
+
+
+class FairScheduler(object):
+    """
+    多路缓冲区的轮询调度
+    put()由解码线程调用并执行该路的丢帧策略；get()由推理线程调用，从上次服务的下一路开始
+    查找有帧的缓冲区，保证每路轮流获得推理机会
+    """
+
+    def __init__(self, streams: list):
+        self.streams = streams
+        self.cond = threading.Condition()
+        self.cursor = 0
+        self.stopped = False
+
+    def put(self, stream: StreamState, item) -> bool:
+        """
+        Returns:
+            False表示该帧被丢弃或调度器已停止
+        """
+        with self.cond:
+            stream.decoded += 1
+            if len(stream.buffer) >= stream.buffer_size:
+                if stream.drop_policy == DROP_OLDEST:
+                    stream.buffer.popleft()
+                    stream.dropped += 1
+                elif stream.drop_policy == DROP_NEWEST:
+                    stream.dropped += 1
+                    return False
+                else:
+                    while len(stream.buffer) >= stream.buffer_size and not self.stopped:
+                        self.cond.wait()
+            if self.stopped:
+                return False
+            stream.buffer.append(item)
+            self.cond.notify_all()
+            return True
+
+    def close(self, stream: StreamState):
+        with self.cond:
+            stream.closed = True
+            self.cond.notify_all()
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+
+    def get(self):
+        """
+        Returns:
+            (stream, item)，所有视频源结束且缓冲区为空或调度器停止时返回None
+        """
+        with self.cond:
+            while not self.stopped:
+                count = len(self.streams)
+                for offset in range(count):
+                    stream = self.streams[(self.cursor + offset) % count]
+                    if stream.buffer:
+                        self.cursor = (self.cursor + offset + 1) % count
+                        item = stream.buffer.popleft()
+                        # 唤醒等待缓冲区空位的解码线程
+                        self.cond.notify_all()
+                        return stream, item
+                if all(stream.closed for stream in self.streams):
+                    return None
+                self.cond.wait()
+            return None
+
+
+def _decode_stream(stream: StreamState, scheduler: FairScheduler, realtime: bool):
+    """解码线程：读取一路视频源；realtime为True时按源帧率节流，用文件模拟实时流"""
+    cap = cv2.VideoCapture(stream.source)
+    try:
+        if not cap.isOpened():
+            print(f"[{stream.stream_id}] 无法打开视频源: {stream.source}")
+            return
+        stream.fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        start = time.perf_counter()
+        index = 0
+        while not scheduler.stopped:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if realtime:
+                delay = start + index / stream.fps - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            scheduler.put(stream, (index, time.perf_counter(), frame))
+            index += 1
+    finally:
+        cap.release()
+        scheduler.close(stream)
+
+
+def _infer_streams(catcher, scheduler: FairScheduler, events, lock: threading.Lock, errors: list):
+    """推理线程：轮流从各路取帧识别"""
+    while True:
+        task = scheduler.get()
+        if task is None:
+            break
+        stream, (index, decoded_at, frame) = task
+        try:
+            results = catcher(frame)
+        except Exception as e:
+            errors.append(e)
+            scheduler.stop()
+            break
+        with lock:
+            stream.record(index, time.perf_counter() - decoded_at)
+            for plate in results:
+                code, confidence = plate[0], plate[1]
+                if confidence > CONFIDENCE_THRESHOLD and code not in stream.printed_plates:
+                    print(f"[{stream.stream_id}] 车牌号: {code:<10} 置信度: {confidence:.4f}")
+                    stream.printed_plates.add(code)
+                    if events is not None:
+                        events.emit(index, index / (stream.fps or 25.0), plate,
+                                    extra=dict(stream=stream.stream_id, source=stream.source))
+
+
+def format_metrics(streams: list) -> str:
+    lines = [f"{'stream':>6}{'decoded':>9}{'processed':>11}{'dropped':>9}{'backlog':>9}{'frame_lag':>11}"
+             f"{'lag_ms':>9}{'mean_ms':>9}{'max_ms':>9}"]
+    for stream in streams:
+        m = stream.metrics()
+        lines.append(f"{m['stream']:>6}{m['decoded']:>9}{m['processed']:>11}{m['dropped']:>9}{m['backlog']:>9}"
+                     f"{m['frame_lag']:>11}{m['lag_ms']:>9.1f}{m['mean_lag_ms']:>9.1f}{m['max_lag_ms']:>9.1f}")
+
+    return "\n".join(lines)
+
+
+def run_streams(sources: list, workers: int = 2, buffer_size: int = 4, drop_policy=DROP_OLDEST,
+                detect_level: int = lpr3.DETECT_LEVEL_LOW, realtime: bool = False, events_path=None,
+                report_every: float = 5.0, processes: bool = False) -> list:
+    """
+    多路视频流共享固定大小的推理池
+    Args:
+        sources: 视频文件路径或流地址列表
+        workers: 推理线程数，与视频路数无关
+        buffer_size: 每路缓冲的最大帧数
+        drop_policy: 丢帧策略，单个值应用于所有路，或与sources等长的列表
+        detect_level: 检测模型等级
+        realtime: 按源帧率读取文件，模拟实时流
+        events_path: NDJSON事件文件路径，每条事件带stream/source字段
+        report_every: 统计输出间隔（秒），0表示只在结束时输出
+        processes: 为True时推理在workers个进程中执行（ParallelLicensePlateCatcher，经共享内存传帧），
+            推理线程只负责调度，避免前后处理受GIL限制
+    Returns:
+        每路的统计信息列表
+    """
+    if isinstance(drop_policy, str):
+        drop_policy = [drop_policy] * len(sources)
+    if len(drop_policy) != len(sources):
+        raise ValueError("丢帧策略的数量与视频源数量不一致")
+    streams = [StreamState(i, str(source), buffer_size, policy)
+               for i, (source, policy) in enumerate(zip(sources, drop_policy))]
+    scheduler = FairScheduler(streams)
+    workers = max(int(workers), 1)
+    pool = None
+    if processes:
+        pool = ParallelLicensePlateCatcher(workers=workers, detect_level=detect_level)
+        catchers = [pool] * workers
+    else:
+        catchers = [lpr3.LicensePlateCatcher(detect_level=detect_level) for _ in range(workers)]
+    events = PlateEventWriter(events_path) if events_path else None
+    lock = threading.Lock()
+    errors = list()
+
+    decoders = [threading.Thread(target=_decode_stream, args=(stream, scheduler, realtime), daemon=True)
+                for stream in streams]
+    inferers = [threading.Thread(target=_infer_streams, args=(catcher, scheduler, events, lock, errors),
+                                 daemon=True) for catcher in catchers]
+    for thread in decoders + inferers:
+        thread.start()
+
+    print(f"视频源: {len(streams)}路，推理{'进程' if processes else '线程'}: {workers}")
+    print("-" * 50)
+    start_time = time.perf_counter()
+    try:
+        last_report = start_time
+        while any(thread.is_alive() for thread in inferers):
+            for thread in inferers:
+                thread.join(timeout=0.2)
+            if report_every > 0 and time.perf_counter() - last_report >= report_every:
+                last_report = time.perf_counter()
+                with lock:
+                    print(format_metrics(streams))
+    except KeyboardInterrupt:
+        print("用户中断处理")
+    finally:
+        scheduler.stop()
+        for thread in decoders + inferers:
+            thread.join(timeout=5)
+        if events is not None:
+            events.close()
+        if pool is not None:
+            pool.close()
+
+    if errors:
+        raise errors[0]
+
+    elapsed = time.perf_counter() - start_time
+    processed = sum(stream.processed for stream in streams)
+    print("-" * 50)
+    print(format_metrics(streams))
+    print(f"处理完成! 共处理 {processed} 帧，耗时 {elapsed:.1f}s，总吞吐 {processed / max(elapsed, 1e-9):.1f}FPS")
+    if events is not None:
+        print(f"共写出 {events.count} 条车牌事件: {events.path}")
+
+    return [stream.metrics() for stream in streams]
+
+
+@click.command(help="Run N video sources against one shared, fixed-size inference pool.")
+@click.argument("sources", nargs=-1, required=True)
+@click.option("-w", "--workers", default=2, type=click.IntRange(min=1), help="Inference threads shared by all streams.")
+@click.option("--buffer", "buffer_size", default=4, type=click.IntRange(min=1), help="Frames buffered per stream.")
+@click.option("--drop", "drop_policy", multiple=True, type=click.Choice(DROP_POLICIES),
+              help="Drop policy, once for all streams or once per stream.")
+@click.option("-det", "--det", default="low", type=click.Choice(["low", "high"]))
+@click.option("--realtime/--no-realtime", default=False, help="Pace file sources at their native FPS.")
+@click.option("--events", "events_path", default=None, type=str, help="NDJSON event file.")
+@click.option("--report-every", default=5.0, type=float, help="Seconds between metric reports.")
+@click.option("--processes/--threads", default=False, help="Run inference in worker processes instead of threads.")
+def main(sources, workers, buffer_size, drop_policy, det, realtime, events_path, report_every, processes):
+    level = lpr3.DETECT_LEVEL_LOW if det == "low" else lpr3.DETECT_LEVEL_HIGH
+    drop_policy = drop_policy[0] if len(drop_policy) == 1 else list(drop_policy) or DROP_OLDEST
+    run_streams(list(sources), workers=workers, buffer_size=buffer_size, drop_policy=drop_policy,
+                detect_level=level, realtime=realtime, events_path=events_path, report_every=report_every, processes=processes)
+
+
+if __name__ == '__main__':
+    main()
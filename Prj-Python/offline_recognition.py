@@ -0,0 +1,247 @@
+"""
+离线视频分段并行识别
+
+录像文件不需要实时输出，把视频按关键帧切成若干段，交给进程池并行处理：
+- 每个工作进程持有独立的LicensePlateCatcher，段内逐帧检测、跟踪并融合识别结果
+- 分段边界优先对齐关键帧（需要ffprobe），各进程seek时不必从上一个关键帧开始白白解码
+- 在分段边界被切开的同一车辆按车牌号或边界处的框位置拼接，只输出一次
+- 所有事件按帧序号合并写入一个NDJSON文件
+
+用法（在Prj-Python目录下）：
+    python offline_recognition.py ../TestImage/Video001.mp4 -p 4
+"""
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import click
+import cv2
+
+import hyperlpr3 as lpr3
+from utils.tracker import PlateTracker, box_iou, track_and_recognize
+from video_recognition import PlateEventWriter
+
+# 置信度阈值，与process_video一致
+CONFIDENCE_THRESHOLD = 0.99
+
+# 工作进程内的识别器，由_init_worker创建，进程内所有分段复用
+_catcher = None
+
+
+def _init_worker(detect_level, num_threads):
+    global _catcher
+    # 多进程并行时每个进程只用少量线程，避免线程数超过核心数
+    cv2.setNumThreads(1)
+    _catcher = lpr3.LicensePlateCatcher(detect_level=detect_level, num_threads=num_threads)
+
+
+def probe_keyframes(video_path, fps: float) -> list:
+    """
+    用ffprobe读取关键帧位置
+    Returns:
+        关键帧的帧序号列表（升序）；没有ffprobe或读取失败时返回空列表
+    """
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe is None or fps <= 0:
+        return []
+    cmd = [ffprobe, "-v", "error", "-select_streams", "v:0", "-skip_frame", "nokey",
+           "-show_entries", "frame=pts_time", "-of", "csv=p=0", str(video_path)]
+    try:
+        output = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=600).stdout
+    except (OSError, subprocess.SubprocessError):
+        return []
+    frames = set()
+    for line in output.splitlines():
+        try:
+            frames.add(int(round(float(line.strip().split(",")[0]) * fps)))
+        except ValueError:
+            # pts为N/A的帧
+            continue
+
+    return sorted(frames)
+
+
+def split_segments(total_frames: int, fps: float, segment_seconds: float, keyframes: list = None) -> list:
+    """
+    把[0, total_frames)切分为若干段，每段不短于segment_seconds，有关键帧时分段起点落在关键帧上
+    Returns:
+        [(start, end), ...]
+    """
+    target = max(int(segment_seconds * fps), 1)
+    bounds = [0]
+    if keyframes:
+        for frame in keyframes:
+            if bounds[-1] + target <= frame < total_frames:
+                bounds.append(frame)
+    else:
+        bounds.extend(range(target, total_frames, target))
+    bounds.append(total_frames)
+
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _process_segment(video_path, start: int, end: int, recognize_every: int, max_missed: int) -> dict:
+    """在工作进程中处理[start, end)区间的帧，返回该段内的全部轨迹"""
+    t0 = time.perf_counter()
+    tracker = PlateTracker(max_missed=max_missed, recognize_every=recognize_every)
+    tracks = list()
+    index = start
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if start > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        while index < end:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            _, finished = track_and_recognize(tracker, _catcher.recognize, frame, _catcher.detect(frame),
+                                              index, timestamp)
+            tracks.extend(finished)
+            index += 1
+    finally:
+        cap.release()
+    tracks.extend(tracker.flush())
+
+    return dict(start=start, end=end, frames=index - start, elapsed=time.perf_counter() - t0, tracks=tracks)
+
+
+def stitch_tracks(segments: list, max_missed: int, iou_threshold: float = 0.3) -> list:
+    """
+    拼接在分段边界处被切开的轨迹
+    前一段末尾仍存活的轨迹与后一段开头出现的轨迹，若融合车牌号相同或边界处的框IoU达到阈值，
+    则视为同一车辆并合并投票
+    Args:
+        segments: 按start升序的_process_segment结果
+    Returns:
+        合并后的轨迹列表
+    """
+    stitched = list()
+    tail = list()
+    for segment in segments:
+        heads = [t for t in segment['tracks'] if t.first_frame <= segment['start'] + max_missed]
+        absorbed = set()
+        for prev in tail:
+            prev_fused = prev.fused()
+            for head in heads:
+                if id(head) in absorbed:
+                    continue
+                head_fused = head.fused()
+                same_code = prev_fused is not None and head_fused is not None and prev_fused[0] == head_fused[0]
+                if same_code or box_iou(prev.box, head.first_box) >= iou_threshold:
+                    head.merge(prev)
+                    absorbed.add(id(head))
+                    break
+            else:
+                stitched.append(prev)
+        tail = [t for t in segment['tracks'] if t.last_frame >= segment['end'] - 1 - max_missed]
+        tail_ids = set(id(t) for t in tail)
+        stitched.extend(t for t in segment['tracks'] if id(t) not in tail_ids)
+    stitched.extend(tail)
+
+    return stitched
+
+
+def process_video_offline(video_path, output_dir, processes: int = None, segment_seconds: float = 30.0,
+                          detect_level: int = lpr3.DETECT_LEVEL_HIGH, recognize_every: int = 15,
+                          max_missed: int = 10, events_path=None):
+    """
+    分段并行处理视频文件，输出按帧序号排序的车牌事件
+    Args:
+        video_path: 视频文件路径
+        output_dir: 输出目录，events_path为空时事件文件写到这里
+        processes: 工作进程数，默认为CPU核心数
+        segment_seconds: 目标分段时长（秒），分段数应明显多于进程数以平衡负载
+        detect_level: 检测模型等级
+        recognize_every: 同一轨迹的重新识别间隔（帧）
+        max_missed: 轨迹允许连续丢失的帧数，也决定分段边界处拼接的范围
+        events_path: NDJSON事件文件路径
+    Returns:
+        事件文件路径
+    """
+    video_path = str(video_path)
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"无法打开视频文件: {video_path}")
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    cap.release()
+
+    cores = os.cpu_count() or 1
+    processes = max(int(processes or cores), 1)
+    keyframes = probe_keyframes(video_path, fps)
+    segments = split_segments(total_frames, fps, segment_seconds, keyframes)
+    processes = min(processes, len(segments)) or 1
+    if events_path is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        events_path = Path(output_dir) / f"plate_events_offline_{timestamp}.ndjson"
+
+    print(f"视频信息: {total_frames}帧, {fps:.1f}FPS")
+    print(f"分段: {len(segments)}段（{'按关键帧对齐' if keyframes else '未找到ffprobe，按固定帧数切分'}），"
+          f"进程数: {processes}")
+    print("-" * 50)
+
+    start_time = time.perf_counter()
+    # 每个进程分到的ORT线程数，进程数 x 线程数不超过核心数
+    num_threads = max(cores // processes, 1)
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(detect_level, num_threads)) as pool:
+        futures = [pool.submit(_process_segment, video_path, start, end, recognize_every, max_missed)
+                   for start, end in segments]
+        results = list()
+        for future in futures:
+            result = future.result()
+            results.append(result)
+            print(f"分段 [{result['start']}, {result['end']}) 完成: {result['frames']}帧, "
+                  f"{result['frames'] / max(result['elapsed'], 1e-9):.1f}FPS")
+    elapsed = time.perf_counter() - start_time
+
+    tracker = PlateTracker(max_missed=max_missed)
+    tracks = sorted(stitch_tracks(results, max_missed), key=lambda t: (t.best_frame, t.first_frame))
+    events = PlateEventWriter(events_path)
+    try:
+        for track_id, plate_track in enumerate(tracks, start=1):
+            fused = plate_track.fused()
+            if fused is None or not tracker.is_confirmed(plate_track):
+                continue
+            code, confidence, type_idx = fused
+            if confidence <= CONFIDENCE_THRESHOLD:
+                continue
+            print(f"车牌号: {code:<10} 置信度: {confidence:.4f} 识别次数: {plate_track.readings}")
+            plate = [code, confidence, type_idx, plate_track.best_box.tolist()]
+            events.emit(plate_track.best_frame, plate_track.best_timestamp or 0.0, plate,
+                        extra=dict(track_id=track_id, first_frame=plate_track.first_frame,
+                                   last_frame=plate_track.last_frame, readings=plate_track.readings))
+    finally:
+        events.close()
+
+    frames = sum(r['frames'] for r in results)
+    busy = sum(r['elapsed'] for r in results)
+    print("-" * 50)
+    print(f"处理完成! 共处理 {frames} 帧，耗时 {elapsed:.1f}s，吞吐 {frames / max(elapsed, 1e-9):.1f}FPS")
+    print(f"单进程平均 {frames / max(busy, 1e-9):.1f}FPS，并行效率 {busy / max(elapsed * processes, 1e-9):.0%}")
+    print(f"共写出 {events.count} 条车牌事件: {events.path}")
+
+    return events.path
+
+
+@click.command(help="Segment-parallel offline plate recognition for recorded video files.")
+@click.argument("video", type=click.Path(exists=True, dir_okay=False))
+@click.option("-p", "--processes", default=None, type=click.IntRange(min=1), help="Worker processes, default CPU count.")
+@click.option("--segment-seconds", default=30.0, type=float, help="Target segment length.")
+@click.option("-det", "--det", default="high", type=click.Choice(["low", "high"]))
+@click.option("--recognize-every", default=15, type=int)
+@click.option("-o", "--output-dir", default="output", type=str)
+@click.option("--events", "events_path", default=None, type=str, help="NDJSON event file.")
+def main(video, processes, segment_seconds, det, recognize_every, output_dir, events_path):
+    level = lpr3.DETECT_LEVEL_LOW if det == "low" else lpr3.DETECT_LEVEL_HIGH
+    process_video_offline(video, output_dir, processes=processes, segment_seconds=segment_seconds,
+                          detect_level=level, recognize_every=recognize_every, events_path=events_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,16 @@
 import uvicorn
-from models.database import init_db
+from models.database import init_db, get_session
+from utils.rollups import ensure_rollups
 
 if __name__ == "__main__":
     # 初始化数据库
     init_db()
+    # 升级后首次启动时从历史停车记录生成小时汇总
+    session = get_session()
+    try:
+        ensure_rollups(session)
+    finally:
+        session.close()
     
     # 启动FastAPI服务
     uvicorn.run(
@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from models.database import Base
+from models.migrations import HOT_QUERY_INDEXES, check_query_plans, migrate, uses_index
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    migrate(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_every_hot_query_has_an_expected_index(engine):
+    assert set(check_query_plans(engine)) == set(HOT_QUERY_INDEXES)
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERY_INDEXES))
+def test_hot_query_uses_expected_index(engine, name):
+    indexed, plan = check_query_plans(engine)[name]
+    assert indexed, f"{name}: expected {HOT_QUERY_INDEXES[name][0]}, got {plan}"
+
+
+def test_dropped_index_is_reported(engine):
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_parking_records_open_vehicle"))
+    indexed, plan = check_query_plans(engine)["vehicle_exit: open record of vehicle"]
+    assert not indexed, plan
+
+
+def test_scan_only_allowed_on_expected_partial_index():
+    plan = ["SCAN parking_records USING INDEX ix_parking_records_open_lot"]
+    assert uses_index(plan, "ix_parking_records_open_lot", allow_scan=True)
+    assert not uses_index(plan, "ix_parking_records_open_lot")
+    assert not uses_index(plan, "ix_parking_records_open_entry_time", allow_scan=True)
+    assert not uses_index(["SCAN parking_records"], "ix_parking_records_entry_time", allow_scan=True)
+    assert uses_index(["SEARCH parking_hourly_stats USING INDEX ix_parking_hourly_stats_hour (hour>? AND hour<?)",
+                       "USE TEMP B-TREE FOR GROUP BY"], "ix_parking_hourly_stats_hour")
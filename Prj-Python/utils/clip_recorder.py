@@ -0,0 +1,208 @@
+import queue
+import threading
+from collections import deque
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from utils.overlay import draw_label
+
+
+class ClipRecorder(object):
+    """
+    事件片段录制
+
+    以环形缓冲区保存最近pre_seconds秒的原始帧（只保存引用，不拷贝）。车牌事件触发时把缓冲区中的帧
+    交给后台线程，后台线程立即为该片段打开VideoWriter写入，之后post_seconds秒的帧逐帧送入写入队列，
+    写完即释放，不在内存中攒齐整个片段；最佳帧截图也在后台编码。常驻内存约为pre_seconds x fps x
+    单帧大小（1080p约6MB/帧），外加写入队列中尚未写出的帧。
+
+    push()的帧之后不能再被原地修改，需要在帧上绘制时应先拷贝。
+    写入队列中尚未写出的帧超过max_pending_frames时，新片段整段丢弃、录制中的片段提前结束，不阻塞识别流程。
+    """
+
+    def __init__(self, output_dir, fps: float, pre_seconds: float = 2.0, post_seconds: float = 3.0,
+                 max_pending_frames: int = None, jpeg_quality: int = 90):
+        """
+        Args:
+            output_dir: 片段与截图的输出目录
+            fps: 视频帧率，用于换算片段长度和写出片段
+            pre_seconds: 事件之前保留的秒数
+            post_seconds: 事件之后录制的秒数
+            max_pending_frames: 写入队列中最多积压的帧数（截图计1帧），默认为两个完整片段的帧数
+            jpeg_quality: 最佳帧截图的JPEG质量
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.fps = max(float(fps), 1.0)
+        self.pre_frames = max(int(round(pre_seconds * self.fps)), 1)
+        self.post_frames = max(int(round(post_seconds * self.fps)), 0)
+        if max_pending_frames is None:
+            max_pending_frames = 2 * (self.pre_frames + self.post_frames)
+        self.max_pending_frames = max(int(max_pending_frames), self.pre_frames + 1)
+        self.jpeg_quality = jpeg_quality
+        self.buffer = deque(maxlen=self.pre_frames)
+        self.active = list()
+        self.jobs = queue.Queue()
+        self.pending_frames = 0
+        self._pending_lock = threading.Lock()
+        self.count = 0
+        self.written = 0
+        self.dropped = 0
+        self.truncated = 0
+        self._thread = threading.Thread(target=self._write_loop, name="clip-writer", daemon=True)
+        self._thread.start()
+
+    def push(self, frame_index: int, frame: np.ndarray):
+        """按顺序送入每一帧，同时送入正在录制的片段"""
+        self.buffer.append((frame_index, frame))
+        recording = list()
+        for clip in self.active:
+            if not self._reserve(1):
+                self.truncated += 1
+                print(f"片段写入积压，提前结束片段: {clip['clip_path']}")
+                self.jobs.put(("close", clip, None))
+                continue
+            self.jobs.put(("frame", clip, frame))
+            clip['remaining'] -= 1
+            if clip['remaining'] > 0:
+                recording.append(clip)
+            else:
+                self.jobs.put(("close", clip, None))
+        self.active = recording
+
+    def trigger(self, frame_index: int, plate=None, snapshot: bool = True) -> dict:
+        """
+        以当前时刻为中心开始录制一个事件片段，应在push()当前帧之后调用
+        Args:
+            frame_index: 截图帧的帧序号，必须仍在缓冲区中，否则不生成截图
+            plate: [code, confidence, type, box]，截图上会标出车牌框
+            snapshot: 是否同时生成截图，截图帧已不在缓冲区时可之后调用snapshot()单独生成
+        Returns:
+            dict(clip=片段路径, snapshot=截图路径)，没有截图时不含snapshot，片段因积压被丢弃时为空
+        """
+        if not self.buffer:
+            return dict()
+        self.count += 1
+        stem = f"event_{self.count:05d}_f{int(frame_index)}"
+        image = None
+        if snapshot:
+            image = next((frame for index, frame in self.buffer if index == frame_index), None)
+            if image is None:
+                print(f"截图帧{frame_index}已不在缓冲区中，片段{stem}不生成截图")
+        frames = [frame for _, frame in self.buffer]
+        if not self._reserve(len(frames) + (image is not None)):
+            self.dropped += 1
+            print(f"片段写入积压，丢弃片段: {stem}")
+            return dict()
+        clip = dict(
+            clip_path=self.output_dir / f"{stem}.mp4",
+            snapshot_path=self.output_dir / f"{stem}.jpg",
+            remaining=self.post_frames,
+        )
+        self.jobs.put(("open", clip, frames))
+        if image is not None:
+            self.jobs.put(("snapshot", clip, (image, plate)))
+        if clip['remaining'] > 0:
+            self.active.append(clip)
+        else:
+            self.jobs.put(("close", clip, None))
+
+        result = dict(clip=str(clip['clip_path']))
+        if image is not None:
+            result['snapshot'] = str(clip['snapshot_path'])
+        return result
+
+    def snapshot(self, frame_index: int, image: np.ndarray, plate=None, name: str = None) -> dict:
+        """
+        单独生成一张截图，image为调用方保存的帧（例如轨迹的最佳识别帧），之后不能再被原地修改
+        Args:
+            name: 截图文件名（不含扩展名），通常与trigger()返回的片段同名，为None时按事件编号命名
+        Returns:
+            dict(snapshot=截图路径)，因积压被丢弃时为空
+        """
+        if name is None:
+            self.count += 1
+            name = f"event_{self.count:05d}_f{int(frame_index)}"
+        path = self.output_dir / f"{name}.jpg"
+        if not self._reserve(1):
+            self.dropped += 1
+            print(f"片段写入积压，丢弃截图: {path}")
+            return dict()
+        self.jobs.put(("snapshot", dict(snapshot_path=path), (image, plate)))
+        return dict(snapshot=str(path))
+
+    def _reserve(self, frames: int) -> bool:
+        """为即将送入写入队列的帧占用积压额度，超出max_pending_frames时返回False"""
+        with self._pending_lock:
+            if self.pending_frames + frames > self.max_pending_frames:
+                return False
+            self.pending_frames += frames
+            return True
+
+    def _release(self, frames: int):
+        with self._pending_lock:
+            self.pending_frames -= frames
+
+    def _write_loop(self):
+        # 片段路径 -> (VideoWriter, (高, 宽))，打开失败时VideoWriter为None，之后的帧直接丢弃
+        writers = dict()
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            kind, clip, payload = job
+            try:
+                if kind == "open":
+                    writers[clip['clip_path']] = self._open_clip(clip['clip_path'], payload)
+                elif kind == "frame":
+                    writer, size = writers.get(clip['clip_path'], (None, None))
+                    if writer is not None and payload.shape[:2] == size:
+                        writer.write(payload)
+                elif kind == "close":
+                    writer, _ = writers.pop(clip['clip_path'], (None, None))
+                    if writer is not None:
+                        writer.release()
+                        self.written += 1
+                elif kind == "snapshot":
+                    self._write_snapshot(clip['snapshot_path'], *payload)
+            except Exception as e:
+                print(f"写入片段出错: {e}")
+            finally:
+                self._release(len(payload) if kind == "open" else int(kind != "close"))
+        for writer, _ in writers.values():
+            if writer is not None:
+                writer.release()
+
+    def _open_clip(self, path: Path, frames: list) -> tuple:
+        """打开片段的VideoWriter并写入事件前的帧"""
+        height, width = frames[0].shape[:2]
+        writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), self.fps, (width, height))
+        if not writer.isOpened():
+            print(f"无法创建片段文件: {path}")
+            return None, None
+        for frame in frames:
+            if frame.shape[:2] == (height, width):
+                writer.write(frame)
+        return writer, (height, width)
+
+    def _write_snapshot(self, path: Path, image: np.ndarray, plate=None):
+        image = image.copy()
+        if plate is not None:
+            code, confidence, _, box = plate[:4]
+            x1, y1, x2, y2 = [int(v) for v in box]
+            cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            draw_label(image, [code, f" ({confidence:.2f})"], x1, y1, (0, 0, 0), (0, 255, 0), 30)
+        ok, data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if ok:
+            # 兼容Windows下的中文路径
+            data.tofile(str(path))
+
+    def close(self):
+        """视频结束时结束仍在录制的片段（后半段不足post_seconds），并等待后台写入完成"""
+        for clip in self.active:
+            self.jobs.put(("close", clip, None))
+        self.active = list()
+        self.jobs.put(None)
+        self._thread.join()
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import uuid
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 完整图片与车牌裁剪图的文件名后缀
+KIND_FULL = "full"
+KIND_PLATE = "plate"
+
+
+class EvidenceStore(object):
+    """
+    按内容寻址的分层证据图片存储
+
+    以上传图片原始字节的SHA-256作为键，按哈希前缀分层存放（如 ab/cd/abcd...），避免单目录文件过多；
+    相同图片（例如客户端重试上传）只存一份。每个键保存一张压缩后的完整图片和一张车牌裁剪图。
+    写入先落到临时文件再重命名，并发写入同一键时不会互相破坏。
+    """
+
+    def __init__(self, root="uploads", depth: int = 2, width: int = 2, jpeg_quality: int = 85):
+        """
+        Args:
+            root: 存储根目录
+            depth: 分层目录层数
+            width: 每层目录名取哈希的字符数
+            jpeg_quality: 非JPEG上传重新编码以及车牌裁剪图的JPEG质量
+        """
+        self.root = Path(root)
+        self.depth = depth
+        self.width = width
+        self.jpeg_quality = jpeg_quality
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def path(self, digest: str, kind: str = KIND_FULL) -> Path:
+        shards = [digest[i * self.width:(i + 1) * self.width] for i in range(self.depth)]
+        return self.root.joinpath(*shards, f"{digest}_{kind}.jpg")
+
+    def exists(self, digest: str, kind: str = KIND_FULL) -> bool:
+        return self.path(digest, kind).exists()
+
+    def _write(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "wb") as buffer:
+            buffer.write(data)
+        os.replace(tmp_path, path)
+
+    def _encode(self, image: np.ndarray) -> bytes:
+        ok, data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            raise ValueError("图片编码失败")
+        return data.tobytes()
+
+    def put(self, data: bytes, plate_crop: np.ndarray = None, digest: str = None) -> str:
+        """
+        保存一张证据图片，已存在的部分直接跳过
+        Args:
+            data: 上传图片的原始字节，JPEG原样保存，其他格式重新编码为JPEG
+            plate_crop: 车牌区域的BGR图像
+            digest: 已计算好的哈希，为None时在此计算
+        Returns:
+            图片哈希
+        """
+        digest = digest or self.digest(data)
+        full_path = self.path(digest, KIND_FULL)
+        if not full_path.exists():
+            if data[:2] != b"\xff\xd8":
+                image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if image is None:
+                    raise ValueError("无法解码图片")
+                data = self._encode(image)
+            self._write(full_path, data)
+        plate_path = self.path(digest, KIND_PLATE)
+        if plate_crop is not None and plate_crop.size > 0 and not plate_path.exists():
+            self._write(plate_path, self._encode(plate_crop))
+
+        return digest
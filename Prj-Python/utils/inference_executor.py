@@ -0,0 +1,93 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class QueueFullError(RuntimeError):
+    """排队的识别请求已达上限"""
+
+
+class InferenceExecutor(object):
+    """
+    有界识别线程池
+
+    识别在独立的线程池中执行，不占用事件循环；每个线程首次使用时通过factory创建自己的识别器
+    （检测器内部保存中间状态，不能跨线程共享）。等待执行的请求超过max_queue时直接拒绝，
+    而不是无限排队拖慢所有请求。
+    """
+
+    def __init__(self, factory, workers: int = 2, max_queue: int = 32):
+        """
+        Args:
+            factory: 无参函数，返回一个识别器，在每个工作线程中调用一次
+            workers: 工作线程数
+            max_queue: 等待执行的请求上限（不含正在执行的）
+        """
+        self.factory = factory
+        self.workers = max(int(workers), 1)
+        self.max_queue = max(int(max_queue), 0)
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="recognition")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_depth = 0
+
+    @property
+    def catcher(self):
+        """当前工作线程的识别器"""
+        catcher = getattr(self._local, "catcher", None)
+        if catcher is None:
+            catcher = self._local.catcher = self.factory()
+        return catcher
+
+    def submit(self, fn, *args) -> Future:
+        """
+        提交fn(catcher, *args)，catcher为执行线程的识别器
+        Raises:
+            QueueFullError: 排队请求已达上限
+        """
+        with self._lock:
+            if self.pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise QueueFullError("识别队列已满")
+            self.pending += 1
+            self.max_depth = max(self.max_depth, self.pending - self.running)
+        try:
+            return self._pool.submit(self._run, fn, args)
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            raise
+
+    def _run(self, fn, args):
+        with self._lock:
+            self.running += 1
+        try:
+            return fn(self.catcher, *args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.pending -= 1
+                self.completed += 1
+
+    async def run(self, fn, *args):
+        """在事件循环中等待fn(catcher, *args)的结果"""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return dict(
+                workers=self.workers,
+                max_queue=self.max_queue,
+                queue_depth=self.pending - self.running,
+                running=self.running,
+                completed=self.completed,
+                rejected=self.rejected,
+                max_queue_depth=self.max_depth,
+            )
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,108 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from utils.inference_executor import InferenceExecutor
+
+
+class MicroBatcher(object):
+    """
+    跨请求的动态微批处理
+
+    并发到达的请求先进入队列，收集线程取到第一个请求后最多再等待max_wait_ms毫秒或凑满max_batch个，
+    把整批交给InferenceExecutor执行一次fn(catcher, items)，再把结果逐个分发给各请求的Future。
+    max_batch越大、max_wait_ms越长吞吐越高，单请求延迟也越高；max_batch为1时等同于逐个执行。
+    收集线程只负责组批，多个批次可以同时在执行器的不同线程中运行。
+    """
+
+    def __init__(self, executor: InferenceExecutor, fn, max_batch: int = 8, max_wait_ms: float = 5.0):
+        """
+        Args:
+            executor: 执行批次的识别线程池
+            fn: fn(catcher, items)，返回与items一一对应的结果列表
+            max_batch: 单批最大请求数
+            max_wait_ms: 收到第一个请求后等待凑批的最长时间（毫秒）
+        """
+        self.executor = executor
+        self.fn = fn
+        self.max_batch = max(int(max_batch), 1)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.batch_sizes = Counter()
+        self._thread = threading.Thread(target=self._collect, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        future = Future()
+        self._queue.put((future, item))
+        return future
+
+    async def run(self, item):
+        """在事件循环中等待单个请求的结果"""
+        return await asyncio.wrap_future(self.submit(item))
+
+    def _collect(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            stopping = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    task = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if task is None:
+                    stopping = True
+                    break
+                batch.append(task)
+            self._dispatch(batch)
+            if stopping:
+                break
+
+    def _dispatch(self, batch: list):
+        futures = [future for future, _ in batch]
+        items = [item for _, item in batch]
+        with self._lock:
+            self.batch_sizes[len(batch)] += 1
+        try:
+            inner = self.executor.submit(self.fn, items)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        inner.add_done_callback(lambda done: self._resolve(futures, done))
+
+    @staticmethod
+    def _resolve(futures: list, done: Future):
+        error = done.exception()
+        if error is not None:
+            for future in futures:
+                future.set_exception(error)
+            return
+        for future, result in zip(futures, done.result()):
+            future.set_result(result)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            batches = sum(self.batch_sizes.values())
+            items = sum(size * count for size, count in self.batch_sizes.items())
+            return dict(
+                max_batch=self.max_batch,
+                max_wait_ms=self.max_wait * 1000.0,
+                batches=batches,
+                mean_batch_size=items / batches if batches else 0.0,
+            )
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
@@ -0,0 +1,73 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate(object):
+    """
+    基于降采样帧差的运动检测，画面静止时跳过车牌检测
+
+    每帧缩放到width宽的灰度图，与缓慢更新的背景（滑动平均）做差，
+    变化像素占比超过min_area即视为有运动；运动结束后继续保持hold帧全速检测，
+    避免车辆刚停下时漏检。
+    """
+
+    def __init__(self, width: int = 160, diff_threshold: int = 25, min_area: float = 0.002, hold: int = 15,
+                 learning_rate: float = 0.05):
+        """
+        Args:
+            width: 运动检测使用的缩放宽度
+            diff_threshold: 像素灰度差阈值
+            min_area: 变化像素占比阈值
+            hold: 运动结束后继续检测的帧数
+            learning_rate: 背景滑动平均的更新速率，越大越快适应光照变化和静止车辆
+        """
+        self.width = width
+        self.diff_threshold = diff_threshold
+        self.min_area = min_area
+        self.hold = hold
+        self.learning_rate = learning_rate
+        self.background = None
+        self._hold_left = 0
+        self.frames = 0
+        self.skipped = 0
+        self.cost = 0.0
+
+    def update(self, frame: np.ndarray) -> bool:
+        """
+        Returns:
+            True表示需要对该帧做检测，False表示画面静止可以跳过
+        """
+        t0 = time.perf_counter()
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(int(h * self.width / w), 1)), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        if self.background is None:
+            self.background = gray.astype(np.float32)
+            motion = True
+        else:
+            diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+            motion = np.count_nonzero(diff > self.diff_threshold) >= self.min_area * diff.size
+            cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+
+        if motion:
+            self._hold_left = self.hold
+        elif self._hold_left > 0:
+            self._hold_left -= 1
+        active = motion or self._hold_left > 0
+
+        self.frames += 1
+        if not active:
+            self.skipped += 1
+        self.cost += time.perf_counter() - t0
+
+        return active
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.skipped / self.frames if self.frames else 0.0
+
+    @property
+    def mean_cost_ms(self) -> float:
+        return self.cost * 1000.0 / self.frames if self.frames else 0.0
@@ -0,0 +1,126 @@
+import threading
+from contextlib import contextmanager
+
+from utils.parking_stats import current_occupancy
+
+
+class OccupancyCounter(object):
+    """
+    进程内的各停车场在场车辆计数
+
+    启动时从数据库统计未出场的记录作为初值，之后随入场/出场加减，读取不访问数据库。
+    锁只保护计数字典本身的短暂读写，不在持锁时访问数据库，读取与入场/出场不会被对账查询阻塞。
+    对账（reconcile）在锁外执行COUNT查询，用数据库中的实际数量加上查询期间完成的增减覆盖计数，
+    修正直接修改数据库、多进程部署等造成的偏差。
+    """
+
+    def __init__(self, session_factory, reconcile_attempts: int = 3):
+        """
+        Args:
+            session_factory: 无参函数，返回新的数据库会话，用于初始化和对账
+            reconcile_attempts: 对账查询期间有入场/出场正在提交时重新查询的次数，
+                用尽后按查询期间完成的增减修正，偏差最多留到下一次对账
+        """
+        self.session_factory = session_factory
+        self.reconcile_attempts = max(int(reconcile_attempts), 1)
+        self._counts = dict()
+        self._lock = threading.Lock()
+        # 已开始或已完成的更新次数、正在提交的更新数、对账查询期间完成的增减
+        self._version = 0
+        self._inflight = 0
+        self._pending = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.reconciles = 0
+        self.last_drift = dict()
+
+    @contextmanager
+    def update(self, lot_id: int, delta: int):
+        """
+        在with块中提交数据库事务，块内没有异常时把lot_id的计数加delta
+        Example:
+            with occupancy.update(lot_id, 1):
+                db.commit()
+        """
+        with self._lock:
+            self._version += 1
+            self._inflight += 1
+        committed = False
+        try:
+            yield
+            committed = True
+        finally:
+            with self._lock:
+                self._version += 1
+                self._inflight -= 1
+                if committed:
+                    self._counts[lot_id] = self._counts.get(lot_id, 0) + delta
+                    if self._pending is not None:
+                        self._pending.append((lot_id, delta))
+
+    def get(self, lot_id: int) -> int:
+        return self._counts.get(lot_id, 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+    def reconcile(self) -> dict:
+        """
+        用数据库中的实际数量覆盖计数
+
+        查询前后都没有入场/出场在提交时，查询结果就是准确值；否则重新查询，
+        尝试reconcile_attempts次后，用查询结果加上查询期间完成的增减。
+        Returns:
+            {停车场ID: 计数与实际数量之差}，只包含有偏差的停车场
+        """
+        db = self.session_factory()
+        try:
+            for attempt in range(self.reconcile_attempts):
+                with self._lock:
+                    version = self._version
+                    quiet = self._inflight == 0
+                    self._pending = list()
+                actual = current_occupancy(db)
+                db.rollback()
+                with self._lock:
+                    pending, self._pending = self._pending, None
+                    if not (quiet and self._version == version) and attempt + 1 < self.reconcile_attempts:
+                        continue
+                    for lot_id, delta in pending:
+                        actual[lot_id] = actual.get(lot_id, 0) + delta
+                    drift = {lot_id: self._counts.get(lot_id, 0) - actual.get(lot_id, 0)
+                             for lot_id in set(actual) | set(self._counts)}
+                    self._counts = actual
+                    break
+        finally:
+            with self._lock:
+                self._pending = None
+            db.close()
+        self.reconciles += 1
+        self.last_drift = {lot_id: diff for lot_id, diff in drift.items() if diff}
+        return self.last_drift
+
+    def _run(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                drift = self.reconcile()
+            except Exception as e:
+                print(f"在场车辆对账失败: {str(e)}")
+                continue
+            if drift:
+                print(f"在场车辆计数已修正: {drift}")
+
+    def start(self, interval: float = 300.0):
+        """从数据库初始化计数并启动后台对账线程，interval为对账间隔（秒），不大于0时不定期对账"""
+        self.reconcile()
+        if interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(interval,), name="occupancy-reconcile",
+                                            daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,116 @@
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# 按顺序查找可用的中文字体
+FONT_CANDIDATES = [
+    "C:/Windows/Fonts/simhei.ttf",  # Windows 黑体
+    "C:/Windows/Fonts/simsun.ttc",  # Windows 宋体
+    "C:/Windows/Fonts/msyh.ttc",    # Windows 微软雅黑
+    "resource/font/platech.ttf",    # HyperLPR 自带车牌字体
+]
+
+
+@lru_cache(maxsize=None)
+def find_font_path():
+    """查找系统中文字体，结果在进程内缓存，只探测一次"""
+    for path in FONT_CANDIDATES:
+        if Path(path).exists():
+            return path
+    print("警告：未找到中文字体文件，使用默认字体可能无法正确显示中文")
+    return None
+
+
+@lru_cache(maxsize=64)
+def get_font(size: int, font_path: str = None):
+    """按(字号, 字体)缓存字体对象，避免每次绘制都重新加载字体文件"""
+    font_path = font_path or find_font_path()
+    try:
+        if font_path:
+            return ImageFont.truetype(font_path, size, encoding="utf-8")
+    except Exception as e:
+        print(f"加载字体出错: {e}")
+    return ImageFont.load_default()
+
+
+@lru_cache(maxsize=2048)
+def render_text_mask(text: str, size: int, font_path: str = None):
+    """
+    预渲染文本的灰度蒙版并缓存
+    Args:
+        text: 文本
+        size: 字号
+        font_path: 字体路径，为None时使用find_font_path()
+    Returns:
+        (mask, width, height)，mask为只读的float32数组，取值0~1；width/height为文本实际宽高
+    """
+    font = get_font(size, font_path)
+    left, top, right, bottom = font.getbbox(text)
+    canvas = Image.new('L', (max(right, 1), max(bottom, 1)), 0)
+    ImageDraw.Draw(canvas).text((0, 0), text, fill=255, font=font)
+    mask = np.asarray(canvas, dtype=np.float32) / 255.0
+    mask.setflags(write=False)
+
+    return mask, right - left, bottom - top
+
+
+def measure_text(text: str, size: int, font_path: str = None) -> tuple:
+    _, width, height = render_text_mask(text, size, font_path)
+    return width, height
+
+
+def put_text(img: np.ndarray, text: str, left, top, text_color=(0, 0, 0), text_size=20, font_path=None):
+    """
+    在BGR图像上原地绘制文本（支持中文），只在文本所在区域内做混合，不做整帧颜色转换
+    Args:
+        img: BGR图像，会被原地修改
+        text: 文本
+        left/top: 文本左上角坐标
+        text_color: BGR颜色
+        text_size: 字号
+        font_path: 字体路径
+    Returns:
+        绘制后的图像（与输入为同一对象）
+    """
+    mask, _, _ = render_text_mask(text, int(text_size), font_path)
+    h, w = mask.shape
+    img_h, img_w = img.shape[:2]
+    x0, y0 = int(left), int(top)
+    ix0, iy0 = max(x0, 0), max(y0, 0)
+    ix1, iy1 = min(x0 + w, img_w), min(y0 + h, img_h)
+    if ix1 <= ix0 or iy1 <= iy0:
+        return img
+    alpha = mask[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0, None]
+    roi = img[iy0:iy1, ix0:ix1]
+    color = np.asarray(text_color, dtype=np.float32)
+    roi[:] = (roi * (1.0 - alpha) + color * alpha).astype(np.uint8)
+
+    return img
+
+
+def draw_label(img: np.ndarray, parts, left, bottom, text_color=(0, 0, 0), bg_color=(0, 255, 0), text_size=30,
+               font_path=None):
+    """
+    在(left, bottom)上方原地绘制带背景色的标签
+    parts为依次拼接的文本片段，各片段独立缓存，例如[车牌号, " (0.99)"]，
+    使得同一车牌在置信度变化时仍能命中缓存
+    Returns:
+        (img, width, height)
+    """
+    sizes = [measure_text(part, int(text_size), font_path) for part in parts]
+    width = sum(w for w, _ in sizes)
+    height = max((h for _, h in sizes), default=0)
+    top = int(bottom) - height - 5
+    x = int(left)
+    img_h, img_w = img.shape[:2]
+    bx0, by0 = max(x, 0), max(top, 0)
+    bx1, by1 = min(x + width, img_w), min(int(bottom), img_h)
+    if bx1 > bx0 and by1 > by0:
+        img[by0:by1, bx0:bx1] = bg_color
+    for part, (w, _) in zip(parts, sizes):
+        put_text(img, part, x, top, text_color, text_size, font_path)
+        x += w
+
+    return img, width, height
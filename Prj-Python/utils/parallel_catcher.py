@@ -0,0 +1,213 @@
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from utils.shm_ring import FrameRing
+
+
+class WorkerCrashedError(RuntimeError):
+    """工作进程在处理该图片时反复崩溃"""
+
+
+def _worker_main(task_q, result_q, ring, catcher_kwargs):
+    """工作进程：预加载模型后循环处理任务，图片从共享内存帧槽零拷贝读取"""
+    import cv2
+    import hyperlpr3 as lpr3
+    # 进程级并行，关闭OpenCV自身的线程池避免超额订阅
+    cv2.setNumThreads(1)
+    catcher = lpr3.LicensePlateCatcher(**catcher_kwargs)
+    try:
+        while True:
+            task = task_q.get()
+            if task is None:
+                break
+            task_id, slot, payload = task
+            image = ring.view(slot, payload) if slot is not None else payload
+            try:
+                result = catcher(image)
+            except Exception as e:
+                result_q.put((task_id, False, repr(e)))
+            else:
+                result_q.put((task_id, True, result))
+            finally:
+                del image
+    finally:
+        ring.close()
+
+
+class ParallelLicensePlateCatcher(object):
+    """
+    多进程车牌识别池
+
+    启动K个预加载模型的工作进程，图片经共享内存帧槽（FrameRing）传给工作进程，只有槽下标经过队列；
+    超出帧槽大小的图片退化为直接pickle传输。submit()返回Future，map()按输入顺序返回结果。
+    工作进程异常退出时自动重启，并把它未完成的任务重新分配；同一任务导致崩溃超过max_retries次时以
+    WorkerCrashedError结束该任务。
+
+    用法：
+        with ParallelLicensePlateCatcher(workers=4, detect_level=lpr3.DETECT_LEVEL_LOW) as pool:
+            for result in pool.map(images):
+                ...
+    """
+
+    def __init__(self, workers: int = None, slot_shape=(1080, 1920, 3), slots: int = None, max_retries: int = 1,
+                 num_threads: int = 1, **catcher_kwargs):
+        """
+        Args:
+            workers: 工作进程数，默认为CPU核心数
+            slot_shape: 共享内存帧槽的最大图片形状
+            slots: 帧槽数量，即在途图片数上限，默认为workers的2倍
+            max_retries: 单个任务因工作进程崩溃而重试的次数
+            num_threads: 每个工作进程中onnxruntime会话的线程数，进程数 x 线程数不宜超过核心数
+            catcher_kwargs: 传给LicensePlateCatcher的其他参数，如detect_level
+        """
+        self.workers = max(int(workers or multiprocessing.cpu_count()), 1)
+        self.max_retries = max_retries
+        self.catcher_kwargs = dict(catcher_kwargs, num_threads=num_threads)
+        self._ctx = multiprocessing.get_context("spawn")
+        self.ring = FrameRing(slots or self.workers * 2, slot_shape, ctx=self._ctx)
+        self.result_q = self._ctx.Queue()
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        # task_id -> [future, worker, slot, payload, retries]
+        self._pending = dict()
+        self._procs = [None] * self.workers
+        self._task_qs = [None] * self.workers
+        self.restarts = 0
+        self._closed = False
+        for index in range(self.workers):
+            self._start_worker(index)
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def _start_worker(self, index: int):
+        task_q = self._ctx.Queue()
+        proc = self._ctx.Process(target=_worker_main, args=(task_q, self.result_q, self.ring, self.catcher_kwargs),
+                                 daemon=True)
+        proc.start()
+        self._task_qs[index] = task_q
+        self._procs[index] = proc
+
+    def _dispatch(self, task_id: int):
+        """把任务交给在途任务最少的工作进程，调用方需持有self._lock"""
+        load = [0] * self.workers
+        for entry in self._pending.values():
+            if entry[1] is not None:
+                load[entry[1]] += 1
+        index = min(range(self.workers), key=load.__getitem__)
+        entry = self._pending[task_id]
+        entry[1] = index
+        self._task_qs[index].put((task_id, entry[2], entry[3]))
+
+    def submit(self, image: np.ndarray) -> Future:
+        """提交一张BGR图片，帧槽全部在途时阻塞等待"""
+        if self._closed:
+            raise RuntimeError("识别池已关闭")
+        future = Future()
+        slot, payload = None, image
+        if image.nbytes <= self.ring.slot_bytes and image.dtype == self.ring.dtype:
+            slot, payload = self.ring.write(image)
+        with self._lock:
+            task_id = next(self._ids)
+            self._pending[task_id] = [future, None, slot, payload, 0]
+            self._dispatch(task_id)
+
+        return future
+
+    def map(self, images, window: int = None):
+        """
+        按输入顺序逐个返回识别结果，最多window张图片同时在途（默认为帧槽数量）
+        """
+        window = window or self.ring.slots
+        futures = deque()
+        for image in images:
+            futures.append(self.submit(image))
+            if len(futures) >= window:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+    def __call__(self, image: np.ndarray) -> list:
+        return self.submit(image).result()
+
+    def _finish(self, task_id: int, ok: bool, payload):
+        with self._lock:
+            entry = self._pending.pop(task_id, None)
+        if entry is None:
+            return
+        future, _, slot, _, _ = entry
+        if slot is not None:
+            self.ring.release(slot)
+        if ok:
+            future.set_result(payload)
+        elif isinstance(payload, BaseException):
+            future.set_exception(payload)
+        else:
+            future.set_exception(RuntimeError(payload))
+
+    def _check_workers(self):
+        """重启异常退出的工作进程，并重新分配其未完成的任务"""
+        failed = list()
+        with self._lock:
+            for index, proc in enumerate(self._procs):
+                if self._closed or proc.is_alive():
+                    continue
+                print(f"识别进程{index}异常退出(exitcode={proc.exitcode})，正在重启")
+                self.restarts += 1
+                self._start_worker(index)
+                for task_id, entry in self._pending.items():
+                    if entry[1] != index:
+                        continue
+                    entry[4] += 1
+                    if entry[4] > self.max_retries:
+                        failed.append(task_id)
+                    else:
+                        self._dispatch(task_id)
+        for task_id in failed:
+            self._finish(task_id, False, WorkerCrashedError("识别进程在处理该图片时反复崩溃"))
+
+    def _collect(self):
+        last_check = time.monotonic()
+        while True:
+            try:
+                task_id, ok, payload = self.result_q.get(timeout=0.5)
+            except queue.Empty:
+                if self._closed:
+                    break
+            except (EOFError, OSError):
+                break
+            else:
+                self._finish(task_id, ok, payload)
+            # 持续有结果返回时也要定期检查进程存活
+            if time.monotonic() - last_check >= 0.5:
+                last_check = time.monotonic()
+                self._check_workers()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for task_q in self._task_qs:
+            task_q.put(None)
+        for proc in self._procs:
+            proc.join(timeout=10)
+            if proc.is_alive():
+                proc.terminate()
+        self._collector.join(timeout=5)
+        with self._lock:
+            pending = list(self._pending)
+        for task_id in pending:
+            self._finish(task_id, False, RuntimeError("识别池已关闭"))
+        self.ring.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,49 @@
+"""
+停车记录的查询构造，供api/parking_api.py使用，models.migrations --check检查这些查询的执行计划
+"""
+from datetime import datetime
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from models.database import ParkingLot, ParkingRecord, Vehicle
+
+
+def records_query(db: Session, start_date: str, end_date: str, plate_number: str, status: str):
+    """停车记录查询，按(entry_time, id)倒序，与索引ix_parking_records_entry_time一致"""
+    query = (
+        db.query(
+            ParkingRecord,
+            Vehicle.plate_number,
+            ParkingLot.name.label('parking_lot_name')
+        )
+        .join(Vehicle)
+        .join(ParkingLot)
+    )
+
+    if start_date:
+        query = query.filter(ParkingRecord.entry_time >= datetime.strptime(start_date, "%Y-%m-%d"))
+    if end_date:
+        query = query.filter(ParkingRecord.entry_time <= datetime.strptime(end_date, "%Y-%m-%d"))
+    if plate_number:
+        query = query.filter(Vehicle.plate_number.like(f"%{plate_number}%"))
+    if status:
+        if status == "在场":
+            query = query.filter(ParkingRecord.exit_time.is_(None))
+        elif status == "已离场":
+            query = query.filter(ParkingRecord.exit_time.isnot(None))
+
+    return query.order_by(ParkingRecord.entry_time.desc(), ParkingRecord.id.desc())
+
+
+def after_cursor(query, entry_time: datetime, record_id: int):
+    """只保留records_query排序中位于(entry_time, id)之后的记录"""
+    return query.filter(tuple_(ParkingRecord.entry_time, ParkingRecord.id) < (entry_time, record_id))
+
+
+def open_record_query(db: Session, vehicle_id: int):
+    """车辆未出场的停车记录，走部分索引ix_parking_records_open_vehicle"""
+    return db.query(ParkingRecord).filter(
+        ParkingRecord.vehicle_id == vehicle_id,
+        ParkingRecord.exit_time.is_(None)
+    )
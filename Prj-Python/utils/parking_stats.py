@@ -0,0 +1,217 @@
+import calendar
+from datetime import datetime
+
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import Session
+
+from models.database import ParkingHourlyStat, ParkingLot, ParkingRecord
+
+
+def query_record_statistics(db: Session, start: datetime, end: datetime, now: datetime = None) -> dict:
+    """
+    直接在停车记录上以分组聚合查询计算停车统计，数据库只返回每个停车场一行和每小时一行，不加载停车记录；
+    结果与query_statistics相同，用于校验汇总表
+    Args:
+        db: 数据库会话
+        start: 统计开始时间（含）
+        end: 统计结束时间（不含）
+        now: 计算在场车辆的时间点，默认为当前时间
+    Returns:
+        与/parking/statistics接口相同格式的统计数据
+    """
+    now = now or datetime.now()
+    in_range = and_(ParkingRecord.entry_time >= start, ParkingRecord.entry_time < end)
+    parked = and_(ParkingRecord.exit_time == None, ParkingRecord.entry_time <= now)
+    # SQLite没有时间差函数，用儒略日之差换算为小时
+    hours = (func.julianday(ParkingRecord.exit_time) - func.julianday(ParkingRecord.entry_time)) * 24
+
+    # 时间范围内的记录与当前在场的记录在同一次扫描中按停车场分组统计
+    rows = (
+        db.query(
+            ParkingRecord.parking_lot_id,
+            func.sum(case((in_range, 1), else_=0)),
+            func.sum(case((in_range, func.coalesce(ParkingRecord.fee, 0)), else_=0)),
+            func.sum(case((and_(in_range, ParkingRecord.exit_time != None), hours), else_=0)),
+            func.sum(case((parked, 1), else_=0)),
+        )
+        .filter(or_(in_range, parked))
+        .group_by(ParkingRecord.parking_lot_id)
+        .all()
+    )
+    by_lot = {lot_id: (count or 0, float(revenue or 0), float(duration or 0), occupancy or 0)
+              for lot_id, count, revenue, duration, occupancy in rows}
+
+    total_vehicles = 0
+    total_revenue = 0.0
+    total_duration = 0.0
+    current_occupancy = 0
+    lot_statistics = []
+    for lot in db.query(ParkingLot).order_by(ParkingLot.id).all():
+        count, revenue, duration, occupancy = by_lot.get(lot.id, (0, 0.0, 0.0, 0))
+        total_vehicles += count
+        total_revenue += revenue
+        total_duration += duration
+        current_occupancy += occupancy
+        lot_statistics.append({
+            "lot_id": lot.id,
+            "lot_name": lot.name,
+            "total_vehicles": count,
+            "total_revenue": revenue,
+            "current_occupancy": occupancy,
+            "occupancy_rate": occupancy / lot.capacity if lot.capacity > 0 else 0
+        })
+
+    # 24小时分布，按入场时间的小时分组
+    hour = func.strftime("%H", ParkingRecord.entry_time)
+    hourly_distribution = {f"{i:02d}": 0 for i in range(24)}
+    for key, count in (
+        db.query(hour, func.count(ParkingRecord.id))
+        .join(ParkingLot, ParkingLot.id == ParkingRecord.parking_lot_id)
+        .filter(in_range)
+        .group_by(hour)
+        .all()
+    ):
+        hourly_distribution[key] = count
+
+    return {
+        "total_vehicles": total_vehicles,
+        "total_revenue": total_revenue,
+        "average_duration": total_duration / total_vehicles if total_vehicles > 0 else 0,
+        "current_occupancy": current_occupancy,
+        "lot_statistics": lot_statistics,
+        "hourly_distribution": hourly_distribution
+    }
+
+
+def occupancy_query(db: Session, now: datetime):
+    """各停车场在now时的在场车辆数，(停车场ID, 数量)"""
+    return (
+        db.query(ParkingRecord.parking_lot_id, func.count(ParkingRecord.id))
+        .filter(ParkingRecord.exit_time == None, ParkingRecord.entry_time <= now)
+        .group_by(ParkingRecord.parking_lot_id)
+    )
+
+
+def current_occupancy(db: Session, now: datetime = None) -> dict:
+    """返回{停车场ID: 当前在场车辆数}"""
+    return dict(occupancy_query(db, now or datetime.now()).all())
+
+
+def lot_rollups_query(db: Session, start: datetime, end: datetime):
+    """汇总表中[start, end)内各停车场的(停车场ID, 入场数, 收入, 总时长)"""
+    return (
+        db.query(
+            ParkingHourlyStat.parking_lot_id,
+            func.sum(ParkingHourlyStat.entries),
+            func.sum(ParkingHourlyStat.revenue),
+            func.sum(ParkingHourlyStat.total_duration),
+        )
+        .filter(ParkingHourlyStat.hour >= start, ParkingHourlyStat.hour < end)
+        .group_by(ParkingHourlyStat.parking_lot_id)
+    )
+
+
+def hourly_rollups_query(db: Session, start: datetime, end: datetime):
+    """汇总表中[start, end)内按一天中的小时分组的(小时"HH", 入场数)"""
+    hour = func.strftime("%H", ParkingHourlyStat.hour)
+    return (
+        db.query(hour, func.sum(ParkingHourlyStat.entries))
+        .join(ParkingLot, ParkingLot.id == ParkingHourlyStat.parking_lot_id)
+        .filter(ParkingHourlyStat.hour >= start, ParkingHourlyStat.hour < end)
+        .group_by(hour)
+    )
+
+
+def query_statistics(db: Session, start: datetime, end: datetime, now: datetime = None,
+                     occupancy: dict = None) -> dict:
+    """
+    从小时汇总表计算停车统计，查询代价与时间范围内的小时数成正比
+    Args:
+        db: 数据库会话
+        start: 统计开始时间（含），按天统计时为整点
+        end: 统计结束时间（不含）
+        now: 计算在场车辆的时间点，默认为当前时间
+        occupancy: {停车场ID: 在场车辆数}，例如OccupancyCounter.snapshot()，为None时从停车记录统计
+    Returns:
+        与/parking/statistics接口相同格式的统计数据
+    """
+    by_lot = {
+        lot_id: (entries or 0, float(revenue or 0), float(duration or 0))
+        for lot_id, entries, revenue, duration in lot_rollups_query(db, start, end).all()
+    }
+    occupancy_by_lot = occupancy if occupancy is not None else current_occupancy(db, now)
+
+    total_vehicles = 0
+    total_revenue = 0.0
+    total_duration = 0.0
+    total_occupancy = 0
+    lot_statistics = []
+    for lot in db.query(ParkingLot).order_by(ParkingLot.id).all():
+        count, revenue, duration = by_lot.get(lot.id, (0, 0.0, 0.0))
+        occupancy = occupancy_by_lot.get(lot.id, 0)
+        total_vehicles += count
+        total_revenue += revenue
+        total_duration += duration
+        total_occupancy += occupancy
+        lot_statistics.append({
+            "lot_id": lot.id,
+            "lot_name": lot.name,
+            "total_vehicles": count,
+            "total_revenue": revenue,
+            "current_occupancy": occupancy,
+            "occupancy_rate": occupancy / lot.capacity if lot.capacity > 0 else 0
+        })
+
+    hourly_distribution = {f"{i:02d}": 0 for i in range(24)}
+    for key, count in hourly_rollups_query(db, start, end).all():
+        hourly_distribution[key] = count or 0
+
+    return {
+        "total_vehicles": total_vehicles,
+        "total_revenue": total_revenue,
+        "average_duration": total_duration / total_vehicles if total_vehicles > 0 else 0,
+        "current_occupancy": total_occupancy,
+        "lot_statistics": lot_statistics,
+        "hourly_distribution": hourly_distribution
+    }
+
+
+def monthly_report_data(db: Session, year: int, month: int, peak_count: int = 3) -> dict:
+    """
+    从小时汇总表计算月度报表数据
+    Args:
+        peak_count: 高峰时段列出的小时数
+    Returns:
+        utils.report_generator.generate_monthly_report所需的data
+    """
+    days = calendar.monthrange(year, month)[1]
+    start = datetime(year, month, 1)
+    end = datetime(year + month // 12, month % 12 + 1, 1)
+    in_range = and_(ParkingHourlyStat.hour >= start, ParkingHourlyStat.hour < end)
+    entries, exits, revenue, duration = (
+        db.query(
+            func.sum(ParkingHourlyStat.entries),
+            func.sum(ParkingHourlyStat.exits),
+            func.sum(ParkingHourlyStat.revenue),
+            func.sum(ParkingHourlyStat.total_duration),
+        )
+        .filter(in_range)
+        .one()
+    )
+    hour = func.strftime("%H", ParkingHourlyStat.hour)
+    peaks = (
+        db.query(hour, func.sum(ParkingHourlyStat.entries).label("entries"))
+        .filter(in_range)
+        .group_by(hour)
+        .order_by(func.sum(ParkingHourlyStat.entries).desc())
+        .limit(peak_count)
+        .all()
+    )
+
+    return {
+        "total_records": entries or 0,
+        "total_revenue": float(revenue or 0),
+        "avg_daily_vehicles": (entries or 0) / days,
+        "avg_parking_duration": float(duration or 0) / exits if exits else 0.0,
+        "peak_hours": "、".join(f"{int(h):02d}:00-{int(h) + 1:02d}:00" for h, count in sorted(peaks) if count) or "-",
+    }
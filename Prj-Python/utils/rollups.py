@@ -0,0 +1,112 @@
+"""
+停车数据小时汇总表（parking_hourly_stats）的增量维护与重建
+
+入场时对入场小时的entries加1，出场时对同一入场小时的exits、revenue、total_duration累加，
+两者都与停车记录在同一事务中提交。统计接口与月报只读取汇总表，查询代价与天数成正比而与记录数无关。
+
+汇总表缺失或与停车记录不一致时（例如升级前的历史数据、手工修改记录），在Prj-Python目录下重建：
+    python -m utils.rollups                                   # 全部重建
+    python -m utils.rollups --start 2024-01-01 --end 2024-01-31
+"""
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from models.database import ParkingHourlyStat, ParkingRecord, get_session
+
+
+def hour_bucket(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _increment(db: Session, lot_id: int, hour: datetime, **deltas):
+    """对(lot_id, hour)一行的各列原子地累加deltas，行不存在时插入"""
+    table = ParkingHourlyStat.__table__
+    values = dict(parking_lot_id=lot_id, hour=hour, entries=0, exits=0, revenue=0.0, total_duration=0.0)
+    values.update(deltas)
+    stmt = insert(table).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.parking_lot_id, table.c.hour],
+        set_={name: table.c[name] + stmt.excluded[name] for name in deltas}
+    )
+    db.execute(stmt)
+
+
+def record_entry(db: Session, lot_id: int, entry_time: datetime):
+    """登记一次入场，由调用方随停车记录一起提交"""
+    _increment(db, lot_id, hour_bucket(entry_time), entries=1)
+
+
+def record_exit(db: Session, lot_id: int, entry_time: datetime, fee: float, duration: float):
+    """登记一次出场，费用与时长计入入场小时，由调用方随停车记录一起提交"""
+    _increment(db, lot_id, hour_bucket(entry_time), exits=1, revenue=fee or 0.0, total_duration=duration or 0.0)
+
+
+def rebuild_rollups(db: Session, start: datetime = None, end: datetime = None) -> int:
+    """
+    从停车记录重新计算汇总表并提交
+    Args:
+        start: 重建范围的开始时间，None表示最早，按整点向下对齐
+        end: 重建范围的结束时间（不含），None表示最晚，按整点向上对齐
+    Returns:
+        写入的汇总行数
+    """
+    rollups = db.query(ParkingHourlyStat)
+    records = db.query(
+        ParkingRecord.parking_lot_id,
+        func.strftime("%Y-%m-%d %H:00:00", ParkingRecord.entry_time),
+        func.count(ParkingRecord.id),
+        func.count(ParkingRecord.exit_time),
+        func.coalesce(func.sum(ParkingRecord.fee), 0.0),
+        func.coalesce(func.sum(ParkingRecord.parking_duration), 0.0),
+    ).filter(ParkingRecord.parking_lot_id != None)
+    if start is not None:
+        start = hour_bucket(start)
+        rollups = rollups.filter(ParkingHourlyStat.hour >= start)
+        records = records.filter(ParkingRecord.entry_time >= start)
+    if end is not None:
+        if end != hour_bucket(end):
+            end = hour_bucket(end) + timedelta(hours=1)
+        rollups = rollups.filter(ParkingHourlyStat.hour < end)
+        records = records.filter(ParkingRecord.entry_time < end)
+
+    rows = [
+        dict(parking_lot_id=lot_id, hour=datetime.strptime(hour, "%Y-%m-%d %H:%M:%S"), entries=entries, exits=exits,
+             revenue=float(revenue), total_duration=float(duration))
+        for lot_id, hour, entries, exits, revenue, duration in records.group_by(
+            ParkingRecord.parking_lot_id, func.strftime("%Y-%m-%d %H:00:00", ParkingRecord.entry_time)
+        ).all()
+    ]
+    rollups.delete(synchronize_session=False)
+    db.bulk_insert_mappings(ParkingHourlyStat, rows)
+    db.commit()
+
+    return len(rows)
+
+
+def ensure_rollups(db: Session) -> int:
+    """汇总表为空而已有停车记录时（首次升级）全部重建，返回写入的行数"""
+    if db.query(ParkingHourlyStat.hour).first() is not None:
+        return 0
+    if db.query(ParkingRecord.id).first() is None:
+        return 0
+    return rebuild_rollups(db)
+
+
+@click.command(help="Rebuild the hourly per-lot parking rollups from parking_records.")
+@click.option("--start", default=None, type=click.DateTime(formats=["%Y-%m-%d"]), help="First day, default earliest.")
+@click.option("--end", default=None, type=click.DateTime(formats=["%Y-%m-%d"]), help="Last day (inclusive).")
+def main(start, end):
+    db = get_session()
+    try:
+        count = rebuild_rollups(db, start, end + timedelta(days=1) if end is not None else None)
+    finally:
+        db.close()
+    print(f"已重建汇总行: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import multiprocessing
+import queue
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class FrameRing(object):
+    """
+    基于multiprocessing.shared_memory的定长帧槽环形缓冲区
+
+    所有帧槽位于同一块共享内存中，空闲槽的下标通过进程间队列分配，
+    进程之间只需要传递(slot, shape)和少量元数据，接收方用view()得到零拷贝的NumPy视图。
+    对象可以作为Process参数传给子进程，子进程中按名称重新挂载同一块共享内存。
+
+    典型用法：
+        ring = FrameRing(8, (1080, 1920, 3))
+        slot, shape = ring.write(frame)          # 生产者：写入空闲槽
+        task_q.put((slot, shape, meta))          # 只传下标与元数据
+        frame = ring.view(slot, shape)           # 消费者：零拷贝读取
+        ring.release(slot)                       # 用完后归还槽位
+    """
+
+    def __init__(self, slots: int, frame_shape, dtype=np.uint8, ctx=None):
+        """
+        Args:
+            slots: 帧槽数量，同时也是在途帧数的上限
+            frame_shape: 单帧的最大形状，如(1080, 1920, 3)，较小的帧也可以写入
+            dtype: 像素类型
+            ctx: multiprocessing上下文，需要与创建子进程使用的上下文一致
+        """
+        ctx = ctx or multiprocessing.get_context()
+        self.slots = int(slots)
+        self.frame_shape = tuple(int(v) for v in frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.slot_bytes = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * self.slots)
+        self.free = ctx.Queue()
+        for slot in range(self.slots):
+            self.free.put(slot)
+        self._owner = True
+
+    def __getstate__(self):
+        return dict(name=self.shm.name, slots=self.slots, frame_shape=self.frame_shape, dtype=self.dtype.str,
+                    slot_bytes=self.slot_bytes, free=self.free)
+
+    def __setstate__(self, state):
+        self.slots = state['slots']
+        self.frame_shape = state['frame_shape']
+        self.dtype = np.dtype(state['dtype'])
+        self.slot_bytes = state['slot_bytes']
+        self.free = state['free']
+        self.shm = shared_memory.SharedMemory(name=state['name'])
+        self._owner = False
+
+    def acquire(self, timeout: float = None):
+        """
+        取一个空闲槽，所有槽都在使用中时等待，形成生产者的背压
+        Returns:
+            槽下标，超时返回None
+        """
+        try:
+            return self.free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def release(self, slot: int):
+        """归还槽位，消费者用完视图后调用，之后不应再访问该槽的视图"""
+        self.free.put(slot)
+
+    def view(self, slot: int, shape=None) -> np.ndarray:
+        """返回槽中帧的零拷贝视图，shape默认为frame_shape"""
+        shape = tuple(shape) if shape is not None else self.frame_shape
+        count = int(np.prod(shape))
+        if count * self.dtype.itemsize > self.slot_bytes:
+            raise ValueError(f"帧尺寸{shape}超出帧槽大小{self.frame_shape}")
+        return np.ndarray(shape, dtype=self.dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def write(self, frame: np.ndarray, timeout: float = None):
+        """
+        把帧拷贝到一个空闲槽
+        Returns:
+            (slot, shape)，超时返回None
+        """
+        slot = self.acquire(timeout)
+        if slot is None:
+            return None
+        self.view(slot, frame.shape)[...] = frame
+        return slot, frame.shape
+
+    def close(self):
+        """断开本进程对共享内存的映射，创建者还会释放共享内存"""
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+            self._owner = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,250 @@
+from collections import defaultdict
+
+import numpy as np
+
+
+def box_iou(a, b) -> float:
+    """计算两个[x1, y1, x2, y2]框的IoU"""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return float(inter / union) if union > 0 else 0.0
+
+
+def plate_quality(box, score) -> float:
+    """裁剪质量的廉价估计：检测框面积 x 检测置信度，车辆靠近、车牌更清晰时增大"""
+    return float((box[2] - box[0]) * (box[3] - box[1]) * score)
+
+
+class PlateTrack(object):
+    """单个车牌的跟踪状态，识别结果按置信度加权逐字符投票融合"""
+
+    def __init__(self, track_id: int, box, score: float, frame_index: int):
+        self.track_id = track_id
+        self.box = np.asarray(box, dtype=np.float32)
+        self.score = float(score)
+        self.first_frame = frame_index
+        self.last_frame = frame_index
+        self.first_box = self.box
+        self.hits = 1
+        self.missed = 0
+        self.readings = 0
+        self.last_recognized = None
+        # 最佳识别帧，用于事件输出
+        self.best_quality = 0.0
+        self.best_frame = frame_index
+        self.best_box = self.box
+        self.best_timestamp = None
+        # 最佳识别帧的图像，只在track_and_recognize(keep_best_image=True)时保存
+        self.best_image = None
+        # 按车牌长度分组：长度 -> 每个位置的{字符: 累计置信度}
+        self._votes = dict()
+        self._length_weight = defaultdict(float)
+        self._length_count = defaultdict(int)
+        self._type_votes = defaultdict(float)
+
+    def add_reading(self, code: str, confidence: float, plate_type: int, quality: float, frame_index: int,
+                    timestamp: float = None) -> bool:
+        """加入一次识别结果，返回该次是否成为最佳识别帧"""
+        length = len(code)
+        votes = self._votes.setdefault(length, [defaultdict(float) for _ in range(length)])
+        for pos, char in enumerate(code):
+            votes[pos][char] += confidence
+        self._length_weight[length] += confidence
+        self._length_count[length] += 1
+        self._type_votes[plate_type] += confidence
+        self.readings += 1
+        self.last_recognized = frame_index
+        if quality >= self.best_quality:
+            self.best_quality = quality
+            self.best_frame = frame_index
+            self.best_box = self.box
+            self.best_timestamp = timestamp
+            return True
+
+        return False
+
+    def mark_attempt(self, quality: float, frame_index: int):
+        """记录一次没有得到有效车牌的识别，避免同一轨迹逐帧重复识别"""
+        self.last_recognized = frame_index
+        self.best_quality = max(self.best_quality, quality)
+
+    def fused(self):
+        """
+        融合所有识别结果
+        Returns:
+            (code, confidence, plate_type)，尚无识别结果时返回None。
+            confidence为各位置上获胜字符的平均支持度，读数间不一致时会被拉低
+        """
+        if not self._length_weight:
+            return None
+        length = max(self._length_weight, key=self._length_weight.get)
+        count = self._length_count[length]
+        chars = list()
+        support = list()
+        for votes in self._votes[length]:
+            char = max(votes, key=votes.get)
+            chars.append(char)
+            support.append(votes[char] / count)
+        plate_type = max(self._type_votes, key=self._type_votes.get)
+
+        return ''.join(chars), float(np.mean(support)), plate_type
+
+    def merge(self, other: "PlateTrack"):
+        """合并另一段属于同一车辆的轨迹（例如分段处理时在分段边界被切开），投票与统计累加"""
+        for length, votes in other._votes.items():
+            mine = self._votes.setdefault(length, [defaultdict(float) for _ in range(length)])
+            for pos, pos_votes in enumerate(votes):
+                for char, weight in pos_votes.items():
+                    mine[pos][char] += weight
+        for length, weight in other._length_weight.items():
+            self._length_weight[length] += weight
+        for length, count in other._length_count.items():
+            self._length_count[length] += count
+        for plate_type, weight in other._type_votes.items():
+            self._type_votes[plate_type] += weight
+        self.hits += other.hits
+        self.readings += other.readings
+        if other.first_frame < self.first_frame:
+            self.first_frame = other.first_frame
+            self.first_box = other.first_box
+        if other.last_frame > self.last_frame:
+            self.last_frame = other.last_frame
+            self.box = other.box
+        if other.best_quality > self.best_quality:
+            self.best_quality = other.best_quality
+            self.best_frame = other.best_frame
+            self.best_box = other.best_box
+            self.best_timestamp = other.best_timestamp
+            self.best_image = other.best_image
+
+
+class PlateTracker(object):
+    """
+    基于IoU贪心匹配的轻量多目标跟踪器
+
+    每帧传入检测框后返回匹配关系，连续max_missed帧未匹配的轨迹视为结束。
+    needs_recognition()决定某条轨迹在当前帧是否需要重新识别：
+    新轨迹、距上次识别已满recognize_every帧、或裁剪质量较历史最佳提升quality_gain倍。
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_missed: int = 10, recognize_every: int = 15,
+                 quality_gain: float = 1.2, min_hits: int = 3):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.recognize_every = recognize_every
+        self.quality_gain = quality_gain
+        self.min_hits = min_hits
+        self.tracks = list()
+        self._next_id = 1
+
+    def update(self, boxes, scores, frame_index: int):
+        """
+        Args:
+            boxes: N x 4的[x1, y1, x2, y2]
+            scores: N个检测置信度
+            frame_index: 帧序号，需按顺序递增
+        Returns:
+            (matches, finished)，matches为[(track, 检测下标), ...]，包含本帧新建的轨迹；
+            finished为本帧结束的轨迹列表
+        """
+        pairs = list()
+        for t_idx, track in enumerate(self.tracks):
+            for d_idx, box in enumerate(boxes):
+                iou = box_iou(track.box, box)
+                if iou >= self.iou_threshold:
+                    pairs.append((iou, t_idx, d_idx))
+        pairs.sort(reverse=True)
+
+        matched_tracks = set()
+        matched_dets = set()
+        matches = list()
+        for _, t_idx, d_idx in pairs:
+            if t_idx in matched_tracks or d_idx in matched_dets:
+                continue
+            matched_tracks.add(t_idx)
+            matched_dets.add(d_idx)
+            track = self.tracks[t_idx]
+            track.box = np.asarray(boxes[d_idx], dtype=np.float32)
+            track.score = float(scores[d_idx])
+            track.last_frame = frame_index
+            track.hits += 1
+            track.missed = 0
+            matches.append((track, d_idx))
+
+        alive = list()
+        finished = list()
+        for t_idx, track in enumerate(self.tracks):
+            if t_idx not in matched_tracks:
+                track.missed += 1
+            if track.missed > self.max_missed:
+                finished.append(track)
+            else:
+                alive.append(track)
+        self.tracks = alive
+
+        for d_idx, box in enumerate(boxes):
+            if d_idx in matched_dets:
+                continue
+            track = PlateTrack(self._next_id, box, scores[d_idx], frame_index)
+            self._next_id += 1
+            self.tracks.append(track)
+            matches.append((track, d_idx))
+
+        return matches, finished
+
+    def needs_recognition(self, track: PlateTrack, quality: float, frame_index: int) -> bool:
+        if track.last_recognized is None:
+            return True
+        if self.recognize_every > 0 and frame_index - track.last_recognized >= self.recognize_every:
+            return True
+        return quality > track.best_quality * self.quality_gain
+
+    def is_confirmed(self, track: PlateTrack) -> bool:
+        return track.hits >= self.min_hits and track.readings > 0
+
+    @property
+    def active(self) -> bool:
+        return len(self.tracks) > 0
+
+    def flush(self) -> list:
+        """视频结束时取出所有未结束的轨迹"""
+        finished = self.tracks
+        self.tracks = list()
+        return finished
+
+
+def track_and_recognize(tracker: PlateTracker, recognize, frame, detections, frame_index: int, timestamp=None,
+                        keep_best_image: bool = False):
+    """
+    对一帧的检测结果做跟踪，只对需要识别的轨迹调用recognize
+    Args:
+        tracker: 跟踪器
+        recognize: recognize(frame, detection)，通常为LicensePlateCatcher.recognize
+        frame: 当前帧
+        detections: LicensePlateCatcher.detect()的输出
+        frame_index: 帧序号
+        timestamp: 视频内时间戳（秒）
+        keep_best_image: 是否在轨迹上保存最佳识别帧的拷贝（best_image），用于事件截图
+    Returns:
+        (plates, finished)，plates为各轨迹当前的融合结果[code, confidence, type, box]，
+        finished为本帧结束的轨迹
+    """
+    matches, finished = tracker.update(detections[:, :4], detections[:, 4], frame_index)
+    plates = list()
+    for track, d_idx in matches:
+        det = detections[d_idx]
+        quality = plate_quality(det[:4], det[4])
+        if tracker.needs_recognition(track, quality, frame_index):
+            plate = recognize(frame, det)
+            if plate is not None:
+                if track.add_reading(plate[0], plate[1], plate[2], quality, frame_index, timestamp) and keep_best_image:
+                    track.best_image = frame.copy()
+            else:
+                track.mark_attempt(quality, frame_index)
+        fused = track.fused()
+        if fused is not None:
+            plates.append([fused[0], fused[1], fused[2], det[:4].astype(int).tolist()])
+
+    return plates, finished
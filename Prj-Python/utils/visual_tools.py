@@ -1,16 +1,15 @@
 import cv2
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
+from utils.overlay import put_text
 
+PLATE_FONT = "resource/font/platech.ttf"
 
-def cv2ImgAddText(img, text, left, top, textColor=(255, 0, 0), textSize=20):
-    if (isinstance(img, np.ndarray)):  # 判断是否OpenCV图片类型
-        img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-    draw = ImageDraw.Draw(img)
-    fontText = ImageFont.truetype("resource/font/platech.ttf", textSize, encoding="utf-8")
-    draw.text((left, top), text, textColor, font=fontText)
 
-    return cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR)
+def cv2ImgAddText(img, text, left, top, textColor=(255, 0, 0), textSize=20):
+    if not isinstance(img, np.ndarray):  # PIL图片转为OpenCV格式
+        img = cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR)
+    # 字体与文字蒙版均有进程内缓存，只在文本区域内原地绘制
+    return put_text(img, text, left, top, textColor[::-1], textSize, font_path=PLATE_FONT)
 
 
 def draw_full(image: np.ndarray, plate_list: dict, ) -> np.ndarray:
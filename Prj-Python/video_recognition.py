@@ -1,57 +1,32 @@
 import cv2
 import hyperlpr3 as lpr3
 import time
+import json
+import queue
+import threading
 from pathlib import Path
 from datetime import datetime
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
+from utils.overlay import put_text, draw_label, measure_text
+from utils.tracker import PlateTracker, track_and_recognize
+from utils.motion import MotionGate
+from utils.clip_recorder import ClipRecorder
 import warnings
 
 # 过滤numpy警告
 warnings.filterwarnings('ignore', category=RuntimeWarning, module='numpy')
 
 def cv2_img_add_text(img, text, left, top, text_color=(0, 0, 0), text_size=20):
-    """使用PIL绘制中文文本"""
-    if isinstance(img, np.ndarray):
-        img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-    draw = ImageDraw.Draw(img)
-    
-    try:
-        # 尝试使用系统中文字体
-        font_paths = [
-            "C:/Windows/Fonts/simhei.ttf",  # Windows 黑体
-            "C:/Windows/Fonts/simsun.ttc",  # Windows 宋体
-            "C:/Windows/Fonts/msyh.ttc",    # Windows 微软雅黑
-        ]
-        
-        font_path = None
-        for path in font_paths:
-            if Path(path).exists():
-                font_path = path
-                break
-        
-        if font_path:
-            fontStyle = ImageFont.truetype(font_path, text_size)
-        else:
-            # 如果找不到中文字体，使用默认字体
-            fontStyle = ImageFont.load_default()
-            print("警告：未找到中文字体文件，使用默认字体可能无法正确显示中文")
-    except Exception as e:
-        print(f"加载字体出错: {e}")
-        fontStyle = ImageFont.load_default()
-    
-    # 获取文本大小
-    bbox = draw.textbbox((0, 0), text, font=fontStyle)
-    text_width = bbox[2] - bbox[0]
-    text_height = bbox[3] - bbox[1]
-    
-    # 绘制文本
-    draw.text((left, top), text, text_color, font=fontStyle)
-    
-    return cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR), text_width, text_height
+    """使用缓存的中文字体在文本区域内原地绘制文本"""
+    if not isinstance(img, np.ndarray):
+        img = cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR)
+    put_text(img, text, left, top, text_color[::-1], text_size)
+    text_width, text_height = measure_text(text, text_size)
+
+    return img, text_width, text_height
 
 def draw_plate_on_image(img, result):
-    """在图像上绘制车牌检测和识别结果"""
+    """在图像上原地绘制车牌检测和识别结果，标签按车牌号缓存预渲染，只修改标签所在区域"""
     for plate in result:
         code, confidence, type_idx, box = plate[:4]
         x1, y1, x2, y2 = [int(i) for i in box]
@@ -59,24 +34,175 @@ def draw_plate_on_image(img, result):
         # 绘制车牌框
         cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
         
-        # 准备文本
-        text = f"{code} ({confidence:.2f})"
-        
-        # 使用支持中文的方法绘制文本
-        img_with_text, text_width, text_height = cv2_img_add_text(img.copy(), text, x1, y1 - 30, (0, 0, 0), 30)
-        
-        # 绘制文本背景
-        cv2.rectangle(img_with_text, (x1, y1 - text_height - 5), (x1 + text_width, y1), (0, 255, 0), -1)
-        
-        # 再次绘制文本（这次在背景上）
-        img_with_text, _, _ = cv2_img_add_text(img_with_text, text, x1, y1 - text_height - 5, (0, 0, 0), 30)
-        
-        img = img_with_text
+        # 绘制带背景的文本，车牌号与置信度分段缓存
+        draw_label(img, [code, f" ({confidence:.2f})"], x1, y1, (0, 0, 0), (0, 255, 0), 30)
     
     return img
 
-def process_video(video_path, output_dir):
-    """处理视频文件并进行车牌识别"""
+# 队列结束标记
+_STOP = object()
+# 画面静止、跳过检测的帧的结果标记
+_SKIPPED = object()
+
+
+class PlateEventWriter(object):
+    """以NDJSON格式逐行写出车牌事件，每行一个JSON对象"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 行缓冲，便于下游实时tail
+        self.file = open(self.path, 'w', encoding='utf-8', buffering=1)
+        self.count = 0
+
+    def emit(self, frame_index, timestamp, plate, extra: dict = None):
+        code, confidence, type_idx, box = plate[:4]
+        event = dict(
+            code=code,
+            confidence=round(float(confidence), 4),
+            type=int(type_idx),
+            box=[int(v) for v in box],
+            frame=int(frame_index),
+            timestamp=round(float(timestamp), 3),
+            time=datetime.now().isoformat(timespec='milliseconds'),
+        )
+        if extra:
+            event.update(extra)
+        self.file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+
+def _decode_frames(cap, decode_q, in_flight, stop_event, workers, gate=None, stride=1, activity=None,
+                   progress=None):
+    """
+    解码线程：按顺序读取帧放入解码队列，in_flight限制在途帧数以形成背压
+
+    gate判断该帧是否需要检测；stride大于1时，在没有车牌/轨迹（activity未置位）且画面无运动时
+    每stride帧只解码一帧，其余帧只grab不retrieve，不付出像素解码和颜色转换的开销。
+    """
+    seq = 0
+    index = 0
+    dense = False
+    try:
+        while not stop_event.is_set():
+            if not in_flight.acquire(timeout=0.1):
+                continue
+            ended = False
+            while stride > 1 and index % stride and not dense and not activity.is_set():
+                if not cap.grab():
+                    ended = True
+                    break
+                index += 1
+                progress['grabbed'] += 1
+            ret, frame = (False, None) if ended else cap.read()
+            if not ret:
+                in_flight.release()
+                break
+            # 视频内时间戳（秒）
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            active = gate.update(frame) if gate is not None else True
+            # 有运动时立即恢复逐帧解码
+            dense = gate is not None and active
+            decode_q.put((seq, index, timestamp, frame, active))
+            seq += 1
+            index += 1
+    finally:
+        for _ in range(workers):
+            decode_q.put(_STOP)
+
+
+def _infer_frames(infer, decode_q, result_q, stop_event, errors):
+    """推理线程：每个线程持有独立的识别器，infer的结果连同帧序号放入结果队列"""
+    while True:
+        item = decode_q.get()
+        if item is _STOP:
+            result_q.put(_STOP)
+            break
+        seq, index, timestamp, frame, active = item
+        results = None
+        if not stop_event.is_set():
+            try:
+                results = infer(frame) if active else _SKIPPED
+            except Exception as e:
+                errors.append(e)
+                stop_event.set()
+        result_q.put((seq, index, timestamp, frame, results))
+
+
+def _render_frames(result_q, in_flight, stop_event, errors, workers, handle_frame):
+    """渲染/写入线程：按解码顺序重新排序后交给handle_frame处理"""
+    pending = dict()
+    next_seq = 0
+    finished = 0
+    while finished < workers:
+        item = result_q.get()
+        if item is _STOP:
+            finished += 1
+            continue
+        pending[item[0]] = item
+        while next_seq in pending:
+            _, index, timestamp, frame, results = pending.pop(next_seq)
+            next_seq += 1
+            try:
+                # 停止后仍需消费剩余帧以释放在途名额，但不再处理
+                if results is not None and not stop_event.is_set():
+                    handle_frame(index, timestamp, frame, results)
+            except Exception as e:
+                errors.append(e)
+                stop_event.set()
+            finally:
+                in_flight.release()
+
+
+def process_video(video_path, output_dir, workers: int = 1, queue_size: int = 8,
+                  headless: bool = False, events_path=None, annotate_every: int = 0,
+                  track: bool = False, recognize_every: int = 15, motion_gate: bool = False,
+                  stride: int = 1, clips: bool = False, clip_pre: float = 2.0, clip_post: float = 3.0):
+    """
+    处理视频文件并进行车牌识别
+
+    解码、推理、渲染/写入分别在独立线程中运行，之间由有界队列连接：
+    解码线程 -> 解码队列 -> workers个推理线程 -> 结果队列 -> 渲染/写入线程 -> 主线程显示
+    在途帧数上限为queue_size，写入慢时解码线程会被阻塞；输出视频保持原始帧顺序。
+    按'q'或视频结束时各线程依次退出。
+
+    headless模式用于生产环境：不创建窗口，也不绘制和重新编码每一帧，
+    只把车牌事件（车牌号、置信度、类型、位置、帧序号、时间戳）以NDJSON写入events_path；
+    annotate_every大于0时每隔annotate_every帧抽取一帧绘制结果写入标注视频。
+
+    track模式下推理线程只做检测，由按序执行的渲染线程对检测框做IoU跟踪：
+    只在新轨迹、每隔recognize_every帧或裁剪质量明显提升时识别，
+    同一轨迹的多次识别结果按置信度加权逐字符投票融合，每辆车在轨迹结束时只输出一个事件。
+
+    motion_gate开启后解码线程对每帧做降采样帧差，画面静止时跳过检测并沿用上一次的结果，
+    出现运动后立即恢复逐帧检测，结束时输出跳帧比例与运动检测的额外耗时。
+
+    stride大于1时启用自适应抽帧：有车牌、有活动轨迹或画面有运动时逐帧处理，
+    空闲时每stride帧处理一帧，被跳过的帧只grab不解码，也不会写入标注视频。
+
+    clips开启后保留最近clip_pre秒的原始帧，每个车牌事件只写出前后clip_pre/clip_post秒的片段
+    和一张标出车牌的最佳帧JPEG（后台线程编码），路径记录在事件的clip/snapshot字段中；
+    与headless配合使用时可完全不输出整段标注视频。
+
+    Args:
+        video_path: 视频文件路径
+        output_dir: 输出目录
+        workers: 推理线程数，每个线程加载一份独立的识别器
+        queue_size: 在途帧数上限
+        headless: 是否以无界面的仅事件模式运行
+        events_path: 事件NDJSON文件路径，headless模式下默认写入output_dir
+        annotate_every: headless模式下标注视频的抽帧间隔，0表示不输出标注视频
+        track: 是否启用车牌跟踪与投票融合
+        recognize_every: track模式下同一轨迹的最大识别间隔（帧）
+        motion_gate: 是否启用运动检测跳帧
+        stride: 空闲时的抽帧间隔，1表示逐帧处理
+        clips: 是否按事件录制片段
+        clip_pre: 事件之前保留的秒数
+        clip_post: 事件之后录制的秒数
+    """
     # 确保输出目录存在
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -84,9 +210,15 @@ def process_video(video_path, output_dir):
     # 生成输出文件名（使用时间戳）
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_path = output_dir / f"plate_recognition_{timestamp}.mp4"
+    if headless and events_path is None:
+        events_path = output_dir / f"plate_events_{timestamp}.ndjson"
+    # 非headless模式下每一帧都绘制并写入
+    if not headless:
+        annotate_every = 1
     
-    # 初始化车牌识别器（使用高精度模式）
-    catcher = lpr3.LicensePlateCatcher(detect_level=lpr3.DETECT_LEVEL_HIGH)
+    # 初始化车牌识别器（使用高精度模式），识别器内部保存中间状态，每个推理线程各用一份
+    workers = max(int(workers), 1)
+    catchers = [lpr3.LicensePlateCatcher(detect_level=lpr3.DETECT_LEVEL_HIGH) for _ in range(workers)]
     
     # 设置置信度阈值
     CONFIDENCE_THRESHOLD = 0.99
@@ -104,67 +236,203 @@ def process_video(video_path, output_dir):
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps = int(cap.get(cv2.CAP_PROP_FPS))
     
-    # 配置视频写入器
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    writer = cv2.VideoWriter(str(output_path), fourcc, fps, (width, height))
+    # 配置视频写入器，抽帧输出时按抽帧间隔降低帧率
+    writer = None
+    if annotate_every > 0:
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        writer = cv2.VideoWriter(str(output_path), fourcc, max(fps // annotate_every, 1), (width, height))
+    events = PlateEventWriter(events_path) if events_path else None
+    recorder = None
+    if clips:
+        recorder = ClipRecorder(output_dir / f"clips_{timestamp}", fps or 25, clip_pre, clip_post)
     
     print(f"开始处理视频: {video_path}")
-    print(f"输出文件将保存到: {output_path}")
+    if writer is not None:
+        print(f"输出文件将保存到: {output_path}")
+    if events is not None:
+        print(f"车牌事件将写入: {events.path}")
+    if recorder is not None:
+        print(f"事件片段将保存到: {recorder.output_dir}")
+    print(f"推理线程数: {workers}，在途帧数上限: {queue_size}")
     print(f"\n置信度阈值设置为: {CONFIDENCE_THRESHOLD}")
     print("识别到的车牌号（置信度 > {:.2f}）:".format(CONFIDENCE_THRESHOLD))
     print("-" * 50)
-    
-    # 处理每一帧
-    frame_count = 0
-    start_time = time.time()
-    try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            frame_count += 1
-            
-            # 车牌识别
-            results = catcher(frame)
-            
-            # 处理识别结果
+
+    queue_size = max(int(queue_size), 1)
+    decode_q = queue.Queue(maxsize=queue_size)
+    result_q = queue.Queue(maxsize=queue_size)
+    display_q = None if headless else queue.Queue(maxsize=2)
+    in_flight = threading.BoundedSemaphore(queue_size)
+    stop_event = threading.Event()
+    errors = []
+    progress = dict(frames=0, grabbed=0, start_time=time.time(), last_results=[])
+    # 由渲染线程维护：当前是否有车牌或活动轨迹，解码线程据此切换抽帧密度
+    activity = threading.Event()
+    gate = MotionGate() if motion_gate else None
+    tracker = PlateTracker(recognize_every=recognize_every) if track else None
+    # 轨迹ID -> trigger()返回的片段信息；片段在轨迹确认时开始录制，而不是轨迹结束（车辆离开）时
+    track_clips = dict()
+
+    def emit_track(plate_track):
+        # 每条轨迹只输出一次融合后的结果
+        clip = track_clips.pop(plate_track.track_id, None)
+        fused = plate_track.fused()
+        if fused is None or not tracker.is_confirmed(plate_track):
+            return
+        code, confidence, type_idx = fused
+        if confidence <= CONFIDENCE_THRESHOLD:
+            return
+        print(f"车牌号: {code:<10} 置信度: {confidence:.4f} 识别次数: {plate_track.readings}")
+        printed_plates.add(code)
+        plate = [code, confidence, type_idx, plate_track.best_box.tolist()]
+        extra = dict(track_id=plate_track.track_id, first_frame=plate_track.first_frame,
+                     last_frame=plate_track.last_frame, readings=plate_track.readings)
+        if recorder is not None:
+            if clip:
+                extra.update(clip)
+            if plate_track.best_image is not None:
+                # 最佳识别帧的拷贝保存在轨迹上，不依赖环形缓冲区
+                name = Path(clip['clip']).stem if clip else None
+                extra.update(recorder.snapshot(plate_track.best_frame, plate_track.best_image, plate, name))
+        if events is not None:
+            events.emit(plate_track.best_frame, plate_track.best_timestamp or 0.0, plate, extra=extra)
+
+    def track_frame(index, frame_time, frame, detections):
+        # 跟踪检测框，只对需要的轨迹做识别，返回各轨迹当前的融合结果
+        # 识别只用到识别和分类模型，与推理线程中检测器的中间状态互不影响
+        plates, finished = track_and_recognize(tracker, catchers[0].recognize, frame, detections, index, frame_time,
+                                               keep_best_image=recorder is not None)
+        if recorder is not None:
+            for plate_track in tracker.tracks:
+                if plate_track.track_id in track_clips or not tracker.is_confirmed(plate_track):
+                    continue
+                fused = plate_track.fused()
+                if fused is not None and fused[1] > CONFIDENCE_THRESHOLD:
+                    track_clips[plate_track.track_id] = recorder.trigger(index, snapshot=False)
+        for plate_track in finished:
+            emit_track(plate_track)
+
+        return plates
+
+    def handle_frame(index, frame_time, frame, results):
+        progress['frames'] += 1
+        frame_count = progress['frames']
+        annotate = writer is not None and not (frame_count - 1) % annotate_every
+        if recorder is not None:
+            # 缓冲区保存原始帧，之后要在该帧上绘制时先拷贝
+            recorder.push(index, frame.copy() if annotate else frame)
+
+        # 处理识别结果
+        if results is _SKIPPED:
+            # 画面静止，沿用上一次的结果绘制，不更新跟踪和事件
+            results = progress['last_results']
+        elif tracker is not None:
+            results = track_frame(index, frame_time, frame, results)
+        else:
             for plate in results:
                 code, confidence, type_idx, box = plate[:4]
                 if confidence > CONFIDENCE_THRESHOLD and code not in printed_plates:
                     print(f"车牌号: {code:<10} 置信度: {confidence:.4f}")
                     printed_plates.add(code)
-            
-            # 在图像上绘制结果
-            frame_with_results = draw_plate_on_image(frame, results)
-            
-            # 计算和显示FPS
-            if frame_count % 30 == 0:
-                elapsed_time = time.time() - start_time
-                fps_text = f"FPS: {frame_count / elapsed_time:.2f}"
-                cv2.putText(frame_with_results, fps_text, (10, 30),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            
+                    extra = recorder.trigger(index, plate) if recorder is not None else None
+                    if events is not None:
+                        events.emit(index, frame_time, plate, extra=extra)
+        progress['last_results'] = results
+        if results or (tracker is not None and tracker.active):
+            activity.set()
+        else:
+            activity.clear()
+
+        if not annotate:
+            return
+
+        # 在图像上绘制结果
+        frame_with_results = draw_plate_on_image(frame, results)
+
+        # 计算和显示FPS
+        if frame_count % 30 == 0:
+            elapsed_time = time.time() - progress['start_time']
+            fps_text = f"FPS: {frame_count / elapsed_time:.2f}"
+            cv2.putText(frame_with_results, fps_text, (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+
+        # 写入视频文件
+        writer.write(frame_with_results)
+
+        # 显示队列已满时丢弃，避免界面拖慢写入
+        if display_q is not None:
+            try:
+                display_q.put_nowait(frame_with_results)
+            except queue.Full:
+                pass
+
+    threads = [threading.Thread(target=_decode_frames, name="decoder",
+                                args=(cap, decode_q, in_flight, stop_event, workers, gate,
+                                      max(int(stride), 1), activity, progress))]
+    threads += [threading.Thread(target=_infer_frames, name=f"infer-{i}",
+                                 args=(catchers[i].detect if track else catchers[i],
+                                       decode_q, result_q, stop_event, errors))
+                for i in range(workers)]
+    renderer = threading.Thread(target=_render_frames, name="renderer",
+                                args=(result_q, in_flight, stop_event, errors, workers, handle_frame))
+    threads.append(renderer)
+
+    # 处理每一帧
+    for t in threads:
+        t.start()
+    try:
+        if display_q is None:
+            renderer.join()
+        # 界面显示必须在主线程中进行
+        while display_q is not None and (renderer.is_alive() or not display_q.empty()):
+            try:
+                frame_with_results = display_q.get(timeout=0.05)
+            except queue.Empty:
+                continue
             # 显示结果
             cv2.imshow('License Plate Recognition', frame_with_results)
-            
-            # 写入视频文件
-            writer.write(frame_with_results)
-            
+
             # 按'q'退出
             if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-                
+                stop_event.set()
     finally:
+        stop_event.set()
+        for t in threads:
+            t.join()
+        # 输出视频结束时仍在跟踪的车辆
+        if tracker is not None and not errors:
+            for plate_track in tracker.flush():
+                emit_track(plate_track)
         # 释放资源
         cap.release()
-        writer.release()
-        cv2.destroyAllWindows()
-        
+        if writer is not None:
+            writer.release()
+        if events is not None:
+            events.close()
+        if recorder is not None:
+            recorder.close()
+        if display_q is not None:
+            cv2.destroyAllWindows()
+
+    if errors:
+        raise errors[0]
+
     print("-" * 50)
-    print(f"处理完成! 共处理 {frame_count} 帧")
+    print(f"处理完成! 共处理 {progress['frames']} 帧")
+    if progress['grabbed']:
+        print(f"自适应抽帧跳过 {progress['grabbed']} 帧（仅grab未解码）")
     print(f"共识别到 {len(printed_plates)} 个不同车牌")
-    print(f"输出文件已保存到: {output_path}")
+    if gate is not None:
+        print(f"运动检测跳过 {gate.skipped}/{gate.frames} 帧 ({gate.skip_ratio:.1%})，"
+              f"平均每帧额外耗时 {gate.mean_cost_ms:.2f}ms")
+    if writer is not None:
+        print(f"输出文件已保存到: {output_path}")
+    if events is not None:
+        print(f"共写出 {events.count} 条车牌事件: {events.path}")
+    if recorder is not None:
+        print(f"共写出 {recorder.written} 个事件片段: {recorder.output_dir}"
+              + (f"（积压丢弃 {recorder.dropped} 个）" if recorder.dropped else "")
+              + (f"（积压提前结束 {recorder.truncated} 个）" if recorder.truncated else ""))
 
 if __name__ == '__main__':
     # 设置输入输出路径